@@ -13,7 +13,11 @@ from .api import (
     InvalidStationError,
     InvalidDateError,
     Stations,
+    StationIndex,
     Station,
     Schedule,
     Programme,
+    MultiDaySchedule,
+    date_range,
+    schedule_programmes,
 )
@@ -0,0 +1,256 @@
+# encoding: utf-8
+
+"""bbcradio.analytics
+------------------
+
+This module implements aggregate statistics over many schedules.
+
+Programmes are loaded into a ProgrammeTable: packed arrays of start and end
+times as seconds since the Unix epoch, and of interned station, series and
+identifier codes. Aggregations are single passes over these arrays.
+
+Copyright (c) 2021 Steven Maude
+Licensed under the MIT License, see LICENSE.
+"""
+
+import datetime
+from array import array
+from collections import Counter
+
+from .api import schedule_programmes
+
+_SECONDS_PER_DAY = 24 * 60 * 60
+_SECONDS_PER_WEEK = 7 * _SECONDS_PER_DAY
+# The Unix epoch, 1970-01-01, was a Thursday; weeks here start on Monday.
+_EPOCH_WEEKDAY = 3
+_FIRST_MONDAY = datetime.datetime(1970, 1, 5, tzinfo=datetime.timezone.utc)
+_FIRST_MONDAY_SECONDS = int(_FIRST_MONDAY.timestamp())
+
+
+class _Interner:
+    """Maps strings to consecutive integer codes and back."""
+
+    def __init__(self):
+        self._codes = {}
+        self.values = []
+
+    def code(self, value):
+        """Returns the code for value, assigning one if it is new."""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class ProgrammeTable:
+    """Represents programmes from many schedules as packed arrays.
+
+    All times are UTC. Consecutive schedules that overlap can be loaded; see
+    add_schedules().
+    """
+
+    def __init__(self):
+        """Inits an empty ProgrammeTable.
+
+        Attributes:
+            starts: array of integer, programme start times as seconds
+                since the Unix epoch.
+            ends: array of integer, programme end times as seconds since
+                the Unix epoch; equal to the start time if unknown.
+            stations: array of integer, station codes.
+            series: array of integer, series codes.
+            identifiers: array of integer, programme identifier codes.
+            _stations, _series, _identifiers: _Interner, mapping names and
+                identifiers to codes. A missing value is interned as None.
+        """
+        self.starts = array("q")
+        self.ends = array("q")
+        self.stations = array("l")
+        self.series = array("l")
+        self.identifiers = array("l")
+
+        self._stations = _Interner()
+        self._series = _Interner()
+        self._identifiers = _Interner()
+
+    @classmethod
+    def from_schedules(cls, schedules):
+        """Returns a ProgrammeTable of programmes from schedules.
+
+        Arguments:
+            schedules: iterable of Schedule, ordered by date for each
+                station; see add_schedules().
+
+        Returns:
+            ProgrammeTable.
+        """
+        table = cls()
+        table.add_schedules(schedules)
+        return table
+
+    def add_schedules(self, schedules):
+        """Adds the programmes of schedules.
+
+        Programmes also in the station's previous schedule are only added
+        once; see bbcradio.schedule_programmes().
+
+        Arguments:
+            schedules: iterable of Schedule, ordered by date for each
+                station.
+        """
+        for schedule, programmes in schedule_programmes(schedules):
+            station_name = schedule.station.name
+            for programme in programmes:
+                self.add_programme(station_name, programme)
+
+    def add_programme(self, station_name, programme):
+        """Adds a Programme; programmes without a start time are skipped.
+
+        Arguments:
+            station_name: string, the station name.
+            programme: Programme.
+        """
+        start = programme.start
+        if start is None:
+            return
+        end = programme.end
+        info = programme.info
+        self.add(
+            station_name,
+            int(start.timestamp()),
+            int(end.timestamp()) if end is not None else None,
+            info["series_name"],
+            info["identifier"],
+        )
+
+    def add(self, station_name, start, end, series_name, identifier):
+        """Adds a programme.
+
+        Arguments:
+            station_name: string, the station name.
+            start: integer, start time as seconds since the Unix epoch.
+            end: integer, end time as seconds since the Unix epoch, or None.
+            series_name: string, the series name, or None.
+            identifier: string, the programme identifier, or None.
+        """
+        self.starts.append(start)
+        self.ends.append(end if end is not None else start)
+        self.stations.append(self._stations.code(station_name))
+        self.series.append(self._series.code(series_name))
+        self.identifiers.append(self._identifiers.code(identifier))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def airtime(self):
+        """Returns total airtime per station, series and week.
+
+        Returns:
+            Counter, mapping a tuple of station name, series name and week
+            start date in YYYY-MM-DD format to airtime in seconds.
+        """
+        # Group by a single integer combining the codes and week, which is
+        # much cheaper to hash than a tuple.
+        station_count = len(self._stations.values)
+        group_count = station_count * len(self._series.values)
+        totals = {}
+        get = totals.get
+        for station, series, start, end in zip(
+            self.stations, self.series, self.starts, self.ends
+        ):
+            week = (start - _FIRST_MONDAY_SECONDS) // _SECONDS_PER_WEEK
+            group = week * group_count + series * station_count + station
+            totals[group] = get(group, 0) + end - start
+
+        week_starts = {}
+        airtime = Counter()
+        for group, seconds in totals.items():
+            week, group = divmod(group, group_count)
+            series, station = divmod(group, station_count)
+            week_start = week_starts.get(week)
+            if week_start is None:
+                week_start = (
+                    (_FIRST_MONDAY + datetime.timedelta(weeks=week))
+                    .date()
+                    .isoformat()
+                )
+                week_starts[week] = week_start
+            key = (
+                self._stations.values[station],
+                self._series.values[series],
+                week_start,
+            )
+            airtime[key] = seconds
+        return airtime
+
+    def repeats(self):
+        """Returns programmes broadcast more than once on the same station.
+
+        A programme broadcast on several stations at once, a simulcast, is
+        not a repeat.
+
+        Returns:
+            Counter, mapping a tuple of station name and programme
+            identifier to number of broadcasts, for programmes with more
+            than one broadcast.
+        """
+        # As in airtime(), group by a single integer combining the codes.
+        station_count = len(self._stations.values)
+        counts = Counter(
+            identifier * station_count + station
+            for station, identifier in zip(self.stations, self.identifiers)
+        )
+
+        repeats = Counter()
+        for group, count in counts.items():
+            if count < 2:
+                continue
+            identifier, station = divmod(group, station_count)
+            identifier = self._identifiers.values[identifier]
+            if identifier is not None:
+                repeats[self._stations.values[station], identifier] = count
+        return repeats
+
+    def repeat_rate(self):
+        """Returns the fraction of broadcasts that are repeats.
+
+        The first broadcast of each programme on each station is not a
+        repeat; see repeats().
+
+        Returns:
+            float, between 0 and 1; 0 if there are no programmes.
+        """
+        if not self:
+            return 0.0
+        repeats = sum(count - 1 for count in self.repeats().values())
+        return repeats / len(self)
+
+    def busiest_slots(self, n=10, slot_minutes=60):
+        """Returns the weekly time slots in which most programmes start.
+
+        Arguments:
+            n: integer, the maximum number of slots to return.
+            slot_minutes: integer, the slot length in minutes; should divide
+                a day exactly.
+
+        Returns:
+            list of tuple of slot and count, most programmes first, where
+            slot is a tuple of weekday (0 for Monday) and slot start time
+            in HH:MM format.
+        """
+        slot_seconds = slot_minutes * 60
+        counts = Counter(
+            ((start // _SECONDS_PER_DAY + _EPOCH_WEEKDAY) % 7)
+            * _SECONDS_PER_DAY
+            + (start % _SECONDS_PER_DAY) // slot_seconds * slot_seconds
+            for start in self.starts
+        )
+
+        slots = []
+        for slot, count in counts.most_common(n):
+            weekday, seconds = divmod(slot, _SECONDS_PER_DAY)
+            hours, minutes = divmod(seconds // 60, 60)
+            slots.append(((weekday, f"{hours:02d}:{minutes:02d}"), count))
+        return slots
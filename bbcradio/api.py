@@ -9,9 +9,13 @@ Copyright (c) 2021 Steven Maude
 Licensed under the MIT License, see LICENSE.
 """
 
+import contextlib
 import copy
 import datetime
+import difflib
+import heapq
 import json
+import unicodedata
 from collections import OrderedDict
 from urllib.parse import urlparse, urlunparse
 
@@ -20,9 +24,21 @@ from lxml import html
 
 
 class InvalidStationError(Exception):
-    """Raised when an invalid station is selected from Stations."""
+    """Raised when an invalid station is selected from Stations.
 
-    pass
+    Attributes:
+        name: string, the station name that was not found.
+        suggestions: list of string, names of similar stations, best match
+            first.
+    """
+
+    def __init__(self, name, suggestions=None):
+        self.name = name
+        self.suggestions = list(suggestions or [])
+        message = name
+        if self.suggestions:
+            message += "; did you mean: " + ", ".join(self.suggestions)
+        super().__init__(message)
 
 
 class InvalidDateError(Exception):
@@ -35,19 +51,75 @@ class Stations:
     """Represents a collection of radio stations.
 
     Attributes:
+        _base_url: string, the BBC site URL.
+        _stations_path: string, the path of the stations page.
         _stations_url: string, the stations URL.
     """
 
-    _stations_url = "https://www.bbc.co.uk/sounds/schedules"
+    _base_url = "https://www.bbc.co.uk"
+    _stations_path = "/sounds/schedules"
+    _stations_url = _base_url + _stations_path
 
-    def __init__(self, urls=None):
+    def __init__(self, urls=None, base_url=None):
         """Inits Stations.
 
+        Arguments:
+            urls: OrderedDict, mapping a station name as string to URL as
+                string. Defaults to None, to fetch the stations page.
+            base_url: string, a site URL to fetch the stations page and
+                schedules from instead of the BBC site, e.g. a
+                bbcradio.fakeserver.FakeServer. Defaults to None, for the
+                BBC site.
+
         Attributes:
             _urls: OrderedDict, mapping a station name as string to URL
             as string. Defaults to None. Set on first access of urls property.
+            _metadata: dict, mapping a station name as string to a tuple of
+                network type and logo URL, as in Station. Defaults to None,
+                in which case metadata is unknown. Set with _urls on first
+                access of urls property.
+            _index: StationIndex, built from _urls on first access of index
+                property.
         """
         self._urls = urls
+        self._metadata = None
+        self._index = None
+        if base_url is not None:
+            self._stations_url = base_url.rstrip("/") + self._stations_path
+
+    @classmethod
+    def from_records(cls, records):
+        """Returns Stations constructed from records.
+
+        Arguments:
+            records: iterable of records, as returned by records property.
+
+        Returns:
+            Stations.
+        """
+        urls = OrderedDict()
+        metadata = {}
+        for name, url, network_type, logo_url in records:
+            urls[name] = url
+            metadata[name] = (network_type, logo_url)
+
+        stations = cls(urls)
+        stations._metadata = metadata
+        return stations
+
+    def _load(self):
+        """Fetches and sets _urls and _metadata if _urls is not already set."""
+        if self._urls is None:
+            element = get_htmlelement(self._stations_url)
+            urls = OrderedDict()
+            metadata = {}
+            for name, url, network_type, logo_url in self._extract_records(
+                element
+            ):
+                urls[name] = url
+                metadata[name] = (network_type, logo_url)
+            self._urls = urls
+            self._metadata = metadata
 
     @property
     def urls(self):
@@ -57,24 +129,82 @@ class Stations:
             OrderedDict, mapping a station name as string to URL as string.
             This is a shallow copy of _urls.
         """
-        if self._urls is None:
-            element = get_htmlelement(self._stations_url)
-            self._urls = self._extract(element)
+        self._load()
         return self._urls.copy()
 
+    @property
+    def records(self):
+        """Returns a compact, serialisable form of the stations.
+
+        Each record contains only strings or None, so records can be stored
+        as JSON or sent to other processes, and passed to from_records()
+        without fetching the stations page again.
+
+        Returns:
+            list of tuple of station name, URL, network type and logo URL;
+            see Station.
+        """
+        self._load()
+        metadata = self._metadata or {}
+        return [
+            (name, url) + metadata.get(name, (None, None))
+            for name, url in self._urls.items()
+        ]
+
+    @property
+    def stations(self):
+        """Returns all stations.
+
+        Returns:
+            list of Station.
+        """
+        self._load()
+        return [self._station(name) for name in self._urls]
+
+    @property
+    def index(self):
+        """Property getter for _index; sets _index on first access.
+
+        Returns:
+            StationIndex.
+        """
+        if self._index is None:
+            self._load()
+            self._index = StationIndex(self._urls)
+        return self._index
+
     def select(self, name):
         """Returns a Station with the given name or raises an error.
 
+        Names are matched exactly, then case-insensitively and ignoring
+        accents, then against aliases; see StationIndex.
+
         Arguments:
-            name: string, the station name.
+            name: string, the station name or an alias.
+
+        Returns:
+            Station.
+
+        Raises:
+            InvalidStationError: no station matches name. Includes
+                suggestions of similar station names.
+        """
+        station_name = self.index.lookup(name)
+        if station_name is None:
+            raise InvalidStationError(name, self.index.suggest(name))
+        return self._station(station_name)
+
+    def _station(self, name):
+        """Returns a Station, with any known metadata, for a station name.
+
+        Arguments:
+            name: string, a station name in _urls.
 
         Returns:
             Station.
         """
-        url = self.urls.get(name)
-        if url is None:
-            raise InvalidStationError(name)
-        return Station(name, url)
+        network_type, logo_url = (self._metadata or {}).get(name, (None, None))
+        return Station(name, self._urls[name], network_type, logo_url)
 
     @staticmethod
     def _extract(element):
@@ -89,22 +219,46 @@ class Stations:
         Raises:
             AssertionError: No URLs are found.
         """
-        urls = OrderedDict()
+        return OrderedDict(
+            (name, url)
+            for name, url, _, _ in Stations._extract_records(element)
+        )
+
+    @staticmethod
+    def _extract_records(element):
+        """Given lxml.HtmlElement, returns a list of station records.
+
+        Arguments:
+            element: lxml.HtmlElement representing stations page.
+
+        Returns:
+            list of tuple of station name, URL, network type and logo URL;
+            see Station.
+
+        Raises:
+            AssertionError: No URLs are found.
+        """
+        records = []
 
         national_xpath = "//img[@class='station-logo']"
         for elem in element.xpath(national_xpath):
             (station_name,) = elem.xpath("./@alt")
             (url,) = elem.xpath("../@href")
-            urls[station_name] = url
+            (logo_url,) = elem.xpath("./@src")
+            # Logos are grouped by network type, e.g.
+            # .../network-logos/nation/bbc_radio_wales_colour.svg
+            path_parts = urlparse(logo_url).path.split("/")
+            network_type = path_parts[-2] if len(path_parts) > 1 else None
+            records.append((station_name, url, network_type, logo_url))
 
         regional_xpath = "//div[@class='local-stations']//li/a"
         for elem in element.xpath(regional_xpath):
             (station_name,) = elem.xpath("./text()")
             (url,) = elem.xpath("./@href")
-            urls[station_name] = url
+            records.append((station_name, url, "local", None))
 
-        assert len(urls) > 0
-        return urls
+        assert len(records) > 0
+        return records
 
     def __repr__(self):
         return f"Stations(urls={repr(self._urls)})"
@@ -113,22 +267,163 @@ class Stations:
         return self._urls == other._urls
 
 
+def _normalise_name(name):
+    """Returns a station name normalised for lookup.
+
+    Normalisation folds case and accents, and collapses whitespace, e.g.
+    "BBC Radio nan Gàidheal" becomes "bbc radio nan gaidheal".
+
+    Arguments:
+        name: string, the station name.
+
+    Returns:
+        string, the normalised name.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(folded.casefold().split())
+
+
+class StationIndex:
+    """Looks up station names by normalised name or alias.
+
+    Each station is indexed by its normalised name (see _normalise_name()),
+    and by these aliases:
+
+    * the name without a leading "BBC", e.g. "Radio 1";
+    * for "BBC Radio" stations, "R" followed by the rest of the name, e.g.
+      "R4" and "R4 Extra";
+    * the service ID at the end of the station URL, e.g. "p00fzl86".
+
+    Where an alias is shared, the first station with that alias is used;
+    full names always take precedence over aliases.
+    """
+
+    def __init__(self, urls):
+        """Inits StationIndex.
+
+        Arguments:
+            urls: OrderedDict, mapping a station name as string to URL as
+                string. This is referenced, not copied.
+
+        Attributes:
+            _urls: OrderedDict, as urls.
+            _keys: dict, mapping a normalised name or alias as string to
+                station name as string.
+        """
+        self._urls = urls
+        self._keys = {}
+
+        for name in urls:
+            self._keys.setdefault(_normalise_name(name), name)
+        for name, url in urls.items():
+            for alias in self._aliases(name, url):
+                self._keys.setdefault(alias, name)
+
+    @staticmethod
+    def _aliases(name, url):
+        """Returns a list of normalised aliases for a station.
+
+        Arguments:
+            name: string, the station name.
+            url: string, the station schedule URL.
+
+        Returns:
+            list of string.
+        """
+        aliases = []
+        key = _normalise_name(name)
+        if key.startswith("bbc "):
+            short_key = key[len("bbc ") :]
+            aliases.append(short_key)
+            if short_key.startswith("radio "):
+                rest = short_key[len("radio ") :]
+                aliases.append("r" + rest)
+                aliases.append("r" + rest.replace(" ", ""))
+
+        service_id = _service_id(url)
+        if service_id:
+            aliases.append(_normalise_name(service_id))
+        return aliases
+
+    def lookup(self, name):
+        """Returns the station name matching a name or alias.
+
+        Arguments:
+            name: string, the station name or an alias.
+
+        Returns:
+            string, the station name, or None if there is no match.
+        """
+        if name in self._urls:
+            return name
+        return self._keys.get(_normalise_name(name))
+
+    def suggest(self, name, n=3):
+        """Returns station names similar to a name.
+
+        Arguments:
+            name: string, the station name or an alias.
+            n: integer, the maximum number of suggestions.
+
+        Returns:
+            list of string, station names, most similar first.
+        """
+        matches = difflib.get_close_matches(
+            _normalise_name(name), self._keys, n=len(self._keys), cutoff=0.6
+        )
+        suggestions = []
+        for match in matches:
+            station_name = self._keys[match]
+            if station_name not in suggestions:
+                suggestions.append(station_name)
+            if len(suggestions) == n:
+                break
+        return suggestions
+
+
+def _service_id(url):
+    """Returns the service ID from a station schedule URL.
+
+    Arguments:
+        url: string, the station schedule URL, e.g.
+            "https://www.bbc.co.uk/schedules/p00fzl86".
+
+    Returns:
+        string, the service ID, e.g. "p00fzl86".
+    """
+    return urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
 class Station:
-    """Represents a single radio station."""
+    """Represents a single radio station.
+
+    A Station's constructor arguments are its compact form: a tuple of
+    these, as in Stations.records, can be stored and passed to Station().
+    """
 
-    def __init__(self, name, url):
+    def __init__(self, name, url, network_type=None, logo_url=None):
         """Inits Station.
 
         Args:
             name: string, the station name.
             url: string, the station schedule URL.
+            network_type: string, "national" for UK-wide stations, "nation"
+                for stations of a UK nation, or "local" for local stations.
+                Defaults to None, if unknown.
+            logo_url: string, the station logo URL. Defaults to None, if
+                unknown or the station has no logo.
 
         Attributes:
             _name: string, the station name.
             _url: string, the station schedule URL.
+            _network_type: string, as network_type.
+            _logo_url: string, as logo_url.
         """
         self._name = name
         self._url = url
+        self._network_type = network_type
+        self._logo_url = logo_url
 
     @property
     def name(self):
@@ -140,33 +435,62 @@ class Station:
         """Property getter for .url."""
         return self._url
 
+    @property
+    def service_id(self):
+        """Returns the service ID, derived from the URL, e.g. "p00fzl86"."""
+        return _service_id(self._url)
+
+    @property
+    def network_type(self):
+        """Property getter for _network_type."""
+        return self._network_type
+
+    @property
+    def logo_url(self):
+        """Property getter for _logo_url."""
+        return self._logo_url
+
     def __repr__(self):
-        return f"Station(name={repr(self._name)}, url={repr(self._url)})"
+        return (
+            f"Station(name={repr(self._name)}, url={repr(self._url)}, "
+            f"network_type={repr(self._network_type)}, "
+            f"logo_url={repr(self._logo_url)})"
+        )
 
     def __eq__(self, other):
+        # Metadata is not compared: a Station constructed from a name and
+        # URL alone equals one selected from Stations.
         return self._name == other._name and self._url == other._url
 
 
 class Schedule:
     """Represents a radio station schedule."""
 
-    def __init__(self, station, date):
+    def __init__(self, station, date, programmes=None):
         """Inits Schedule.
 
         Arguments:
             station: Station.
             date: string, ISO8601 date in YYYY-MM-DD format.
+            programmes: sequence of Programme, for a schedule that is already
+                known. Defaults to None, to fetch the schedule.
 
         Attributes:
-            _programmes: list of Programme; defaults to None. Set on first
-                access of programmes property.
+            _programmes: sequence of Programme; defaults to programmes. If
+                None, set once all programmes have been decoded, on first
+                access of programmes property or the end of the first
+                complete iteration.
+            _graph: list of dict, the schedule's undecoded JSON-LD @graph;
+                defaults to None. Set on first fetch, and cleared once
+                _programmes is set.
             _station: Station.
             date: string, ISO8601 date in YYYY-MM-DD format.
 
         Raises:
             ValueError: date provided was not in YYYY-MM-DD format.
         """
-        self._programmes = None
+        self._programmes = programmes
+        self._graph = None
         self._station = station
 
         # Validate that this is a valid YYYY-MM-DD string.
@@ -187,10 +511,40 @@ class Schedule:
         Returns:
             list of Programme. This is a deep copy of _programmes.
         """
-        if self._programmes is None:
+        return copy.deepcopy(list(self.iter_programmes()))
+
+    def iter_programmes(self):
+        """Yields programmes, decoding each from the schedule as needed.
+
+        The schedule is fetched on first iteration, but programmes are only
+        decoded as they are consumed, so stopping early, e.g. on finding the
+        first programme after a given time, avoids decoding the rest.
+
+        Unlike programmes property, this yields the cached Programme objects
+        themselves, not copies.
+
+        Yields:
+            Programme.
+        """
+        if self._programmes is not None:
+            yield from self._programmes
+            return
+
+        if self._graph is None:
             element = get_htmlelement(self._construct_url())
-            self._programmes = self._extract(element)
-        return copy.deepcopy(self._programmes)
+            self._graph = self._extract_graph(element)
+
+        programmes = []
+        for programme_details in self._graph:
+            programme = self._decode(programme_details)
+            programmes.append(programme)
+            yield programme
+
+        self._programmes = programmes
+        self._graph = None
+
+    def __iter__(self):
+        return self.iter_programmes()
 
     @property
     def station(self):
@@ -229,7 +583,25 @@ class Schedule:
             list of Programme.
 
         Raises:
-            AssertionError: no schedule details found in element.
+            ValueError: no schedule details found in element.
+        """
+        return [
+            Schedule._decode(programme_details)
+            for programme_details in Schedule._extract_graph(element)
+        ]
+
+    @staticmethod
+    def _extract_graph(element):
+        """Returns the undecoded programmes for a schedule HTML page element.
+
+        Arguments:
+            element: lxml.HtmlElement of schedule page
+
+        Returns:
+            list of dict, the JSON-LD @graph of programme details.
+
+        Raises:
+            ValueError: no schedule details found in element.
         """
         schema_xpath = '//script[@type="application/ld+json"]/text()'
         schemas_text = element.xpath(schema_xpath)
@@ -237,32 +609,37 @@ class Schedule:
         for schema_text in schemas_text:
             schedule_details = json.loads(schema_text)
             if schedule_details.get("@graph") is not None:
-                break
-        else:
-            raise ValueError("schedule details not found in HTML element")
+                return schedule_details["@graph"]
 
-        programmes = []
+        raise ValueError("schedule details not found in HTML element")
 
-        for programme_details in schedule_details["@graph"]:
-            d = {}
+    @staticmethod
+    def _decode(programme_details):
+        """Returns a Programme for programme details from a JSON-LD @graph.
 
-            publication = programme_details.get("publication")
-            if publication is not None:
-                d["start_date"] = publication.get("startDate")
+        Arguments:
+            programme_details: dict, one item of the @graph.
 
-            series_details = programme_details.get("partOfSeries")
-            if series_details is not None:
-                d["series_name"] = series_details.get("name")
+        Returns:
+            Programme.
+        """
+        d = {}
 
-            d["name"] = programme_details.get("name")
-            d["description"] = programme_details.get("description")
-            d["identifier"] = programme_details.get("identifier")
-            d["url"] = programme_details.get("url")
+        publication = programme_details.get("publication")
+        if publication is not None:
+            d["start_date"] = publication.get("startDate")
+            d["end_date"] = publication.get("endDate")
 
-            programme = Programme(**d)
-            programmes.append(programme)
+        series_details = programme_details.get("partOfSeries")
+        if series_details is not None:
+            d["series_name"] = series_details.get("name")
+
+        d["name"] = programme_details.get("name")
+        d["description"] = programme_details.get("description")
+        d["identifier"] = programme_details.get("identifier")
+        d["url"] = programme_details.get("url")
 
-        return programmes
+        return Programme(**d)
 
     def __str__(self):
         return (
@@ -286,6 +663,7 @@ class Programme:
 
         Arguments:
             **start_date: string, start date/time of programme.
+            **end_date: string, end date/time of programme.
             **series_name: string, series name of programme.
             **name: string, name of programme.
             **description: string, description of programme.
@@ -295,10 +673,13 @@ class Programme:
         Attributes:
             _info: OrderedDict, representing programme information. Constructed
                 by **kwargs; see Arguments.
+            _times: tuple of start and end datetime.datetime, parsed from
+                _info on first access, or None.
         """
         self._info = OrderedDict(
             [
                 ("start_date", None),
+                ("end_date", None),
                 ("series_name", None),
                 ("name", None),
                 ("description", None),
@@ -311,6 +692,7 @@ class Programme:
             kwargs_value = kwargs.get(k)
             if kwargs_value is not None:
                 self._info[k] = kwargs_value
+        self._times = None
 
     @property
     def info(self):
@@ -322,6 +704,42 @@ class Programme:
         """
         return self._info.copy()
 
+    @property
+    def start(self):
+        """Returns the start date/time.
+
+        Returns:
+            datetime.datetime, timezone aware, or None if unknown.
+        """
+        return self._parse_times()[0]
+
+    @property
+    def end(self):
+        """Returns the end date/time.
+
+        Returns:
+            datetime.datetime, timezone aware, or None if unknown.
+        """
+        return self._parse_times()[1]
+
+    def _parse_times(self):
+        """Returns the start and end date/times, parsing them once.
+
+        Returns:
+            tuple of datetime.datetime, timezone aware, or None if unknown.
+        """
+        if self._times is None:
+            self._times = (
+                _parse_datetime(self._info["start_date"]),
+                _parse_datetime(self._info["end_date"]),
+            )
+        return self._times
+
+    def __setstate__(self, state):
+        # Programmes pickled by earlier versions have no end_date or _times.
+        self.__init__(**state["_info"])
+        self._times = state.get("_times")
+
     def __repr__(self):
         return f"Programme({repr(dict(self._info))})"
 
@@ -329,8 +747,311 @@ class Programme:
         return self._info == other._info
 
 
-def get_htmlelement(url):
-    """Fetches a URL and returns lxml.HtmlElement.
+class MultiDaySchedule:
+    """Represents schedules for one or more stations over several dates.
+
+    Programmes from each station's schedules are merged into a single
+    time-ordered timeline. A Schedule for a date may contain programmes
+    from the following date; these duplicates are removed.
+    """
+
+    def __init__(self, schedules):
+        """Inits MultiDaySchedule.
+
+        Arguments:
+            schedules: iterable of Schedule. Schedules are not fetched until
+                their programmes are needed.
+
+        Attributes:
+            _schedules: OrderedDict, mapping a tuple of station name and URL
+                to a list of Schedule, ordered by date.
+            _stations: OrderedDict, mapping a tuple of station name and URL
+                to Station.
+        """
+        self._schedules = OrderedDict()
+        self._stations = OrderedDict()
+        for schedule in schedules:
+            key = (schedule.station.name, schedule.station.url)
+            self._schedules.setdefault(key, []).append(schedule)
+            self._stations.setdefault(key, schedule.station)
+
+        for station_schedules in self._schedules.values():
+            station_schedules.sort(key=lambda schedule: schedule.date)
+
+    @classmethod
+    def for_dates(cls, station, start_date, end_date):
+        """Returns a MultiDaySchedule for a station over a date range.
+
+        Arguments:
+            station: Station.
+            start_date: string, first date in YYYY-MM-DD format.
+            end_date: string, last date in YYYY-MM-DD format, inclusive.
+
+        Returns:
+            MultiDaySchedule.
+
+        Raises:
+            InvalidDateError: a date provided was not in YYYY-MM-DD format,
+                or end_date is earlier than start_date.
+        """
+        return cls(
+            Schedule(station, date)
+            for date in date_range(start_date, end_date)
+        )
+
+    @property
+    def stations(self):
+        """Returns the stations with schedules.
+
+        Returns:
+            list of Station.
+        """
+        return list(self._stations.values())
+
+    def schedules(self, station):
+        """Returns a station's schedules.
+
+        Arguments:
+            station: Station.
+
+        Returns:
+            list of Schedule, ordered by date.
+
+        Raises:
+            InvalidStationError: there are no schedules for station.
+        """
+        key = (station.name, station.url)
+        if key not in self._schedules:
+            raise InvalidStationError(station.name)
+        return list(self._schedules[key])
+
+    def timeline(self, station, start=None, end=None):
+        """Yields a station's programmes in time order, without duplicates.
+
+        Schedules are fetched as the timeline is consumed, one date ahead of
+        the programmes yielded. Schedules for dates wholly outside start and
+        end are not fetched. Programmes without a start time are skipped.
+
+        Arguments:
+            station: Station.
+            start: datetime.datetime, timezone aware; only yield programmes
+                ending after this time. Defaults to None, for no limit.
+            end: datetime.datetime, timezone aware; only yield programmes
+                starting before this time. Defaults to None, for no limit.
+
+        Yields:
+            Programme.
+
+        Raises:
+            InvalidStationError: there are no schedules for station.
+        """
+        schedules = self.schedules(station)
+        for programme in self._merge(schedules, start, end):
+            if end is not None and programme.start >= end:
+                return
+            if (
+                start is not None
+                and (programme.end or programme.start) <= start
+            ):
+                continue
+            yield programme
+
+    @staticmethod
+    def _merge(schedules, start=None, end=None):
+        """Yields programmes from schedules in time order, without duplicates.
+
+        Duplicates are removed as in schedule_programmes(). As the next
+        schedule can contain programmes earlier than the end of the
+        previous one, the programmes of each schedule are held until the
+        next is fetched.
+
+        Arguments:
+            schedules: list of Schedule, ordered by date.
+            start: datetime.datetime, timezone aware, or None; schedules
+                for dates that end before this are skipped.
+            end: datetime.datetime, timezone aware, or None; schedules for
+                dates that start after this are skipped.
+
+        Yields:
+            Programme.
+        """
+
+        def wanted_schedules():
+            for schedule in schedules:
+                date = datetime.datetime.strptime(
+                    schedule.date, "%Y-%m-%d"
+                ).date()
+                # A schedule can run into the following morning; allow a
+                # day either side for timezone offsets.
+                if (
+                    start is not None
+                    and date + datetime.timedelta(2) < start.date()
+                ):
+                    continue
+                if (
+                    end is not None
+                    and date - datetime.timedelta(1) > end.date()
+                ):
+                    return
+                yield schedule
+
+        pending = []
+        for _, programmes in schedule_programmes(wanted_schedules()):
+            if not programmes:
+                continue
+
+            boundary = programmes[0].start
+            held = []
+            for programme in pending:
+                if programme.start < boundary:
+                    yield programme
+                else:
+                    held.append(programme)
+            pending = list(
+                heapq.merge(held, programmes, key=lambda p: p.start)
+            )
+
+        yield from pending
+
+    def gaps(self, station):
+        """Returns the gaps between consecutive programmes of a station.
+
+        Arguments:
+            station: Station.
+
+        Returns:
+            list of tuple of Programme, the programme before and after each
+            gap. Programmes without an end time are not compared.
+        """
+        return [
+            (previous, programme)
+            for previous, programme in self._pairs(station)
+            if programme.start > previous.end
+        ]
+
+    def overlaps(self, station):
+        """Returns the overlaps between consecutive programmes of a station.
+
+        Arguments:
+            station: Station.
+
+        Returns:
+            list of tuple of Programme, the earlier and later programme of
+            each overlap. Programmes without an end time are not compared.
+        """
+        return [
+            (previous, programme)
+            for previous, programme in self._pairs(station)
+            if programme.start < previous.end
+        ]
+
+    def _pairs(self, station):
+        """Yields consecutive pairs of programmes from a station's timeline.
+
+        Arguments:
+            station: Station.
+
+        Yields:
+            tuple of Programme, where the first has an end time.
+        """
+        previous = None
+        for programme in self.timeline(station):
+            if previous is not None and previous.end is not None:
+                yield previous, programme
+            previous = programme
+
+    def __repr__(self):
+        return f"MultiDaySchedule({repr(self._schedules)})"
+
+
+def schedule_programmes(schedules):
+    """Yields each schedule's programmes, without cross-midnight duplicates.
+
+    A schedule can contain programmes also in the following date's schedule.
+    A programme is left out if a programme with the same identifier and
+    start time was in the previous schedule for the same station, so the
+    first copy is kept. Only the previous schedule for each station is
+    remembered. Programmes without a start time are left out.
+
+    Arguments:
+        schedules: iterable of Schedule, ordered by date for each station.
+            Each schedule is fetched when it is reached.
+
+    Yields:
+        tuple of Schedule and list of Programme, in schedule order.
+    """
+    previous_keys = {}
+    for schedule in schedules:
+        station_key = (schedule.station.name, schedule.station.url)
+        seen = previous_keys.get(station_key, set())
+        keys = set()
+        programmes = []
+        for programme in schedule:
+            start = programme.start
+            if start is None:
+                continue
+            key = (programme.info["identifier"], start)
+            keys.add(key)
+            if key not in seen:
+                programmes.append(programme)
+        previous_keys[station_key] = keys
+        yield schedule, programmes
+
+
+def _parse_datetime(value):
+    """Returns a datetime for an ISO 8601 date/time string with UTC offset.
+
+    Arguments:
+        value: string, e.g. "2021-01-23T00:00:00+00:00", or None.
+
+    Returns:
+        datetime.datetime, timezone aware, or None if value is None.
+
+    Raises:
+        ValueError: value is not in the expected format.
+    """
+    if value is None:
+        return None
+    if value.endswith("Z"):
+        value = value[:-1] + "+0000"
+    # Python 3.6's strptime() does not accept a colon in the UTC offset.
+    elif value[-3:-2] == ":":
+        value = value[:-3] + value[-2:]
+    return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+
+
+def date_range(start_date, end_date):
+    """Returns the dates from start_date to end_date.
+
+    Arguments:
+        start_date: string, first date in YYYY-MM-DD format.
+        end_date: string, last date in YYYY-MM-DD format, inclusive.
+
+    Returns:
+        list of string, dates in YYYY-MM-DD format.
+
+    Raises:
+        InvalidDateError: a date provided was not in YYYY-MM-DD format, or
+            end_date is earlier than start_date.
+    """
+    try:
+        start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise InvalidDateError(
+            f"invalid date range: {start_date} to {end_date}"
+        )
+    if end < start:
+        raise InvalidDateError(
+            f"end date is before start date: {start_date} to {end_date}"
+        )
+
+    days = (end - start).days + 1
+    return [(start + datetime.timedelta(n)).isoformat() for n in range(days)]
+
+
+def fetch(url):
+    """Fetches a URL and returns the response.
 
     Helper with timeout for requests.
 
@@ -338,10 +1059,48 @@ def get_htmlelement(url):
         url: string, the URL.
 
     Returns:
-        lxml.HtmlElement representing the requested page.
+        requests.Response for the requested page.
+
+    Raises:
+        requests.exceptions.HTTPError: the response was an error status.
     """
     r = requests.get(url, timeout=30)
     r.raise_for_status()
+    return r
+
+
+# The function get_htmlelement() uses to fetch pages; see fetching_with().
+_fetch = fetch
+
+
+@contextlib.contextmanager
+def fetching_with(fetch):
+    """Temporarily replaces the function get_htmlelement() fetches with.
+
+    See bbcradio.archive for recording and replaying fetched pages.
+
+    Arguments:
+        fetch: callable, taking a URL and returning a response.
+    """
+    global _fetch
+    previous = _fetch
+    _fetch = fetch
+    try:
+        yield
+    finally:
+        _fetch = previous
+
+
+def get_htmlelement(url):
+    """Fetches a URL and returns lxml.HtmlElement.
+
+    Args:
+        url: string, the URL.
+
+    Returns:
+        lxml.HtmlElement representing the requested page.
+    """
+    r = _fetch(url)
 
     element = html.fromstring(r.text)
 
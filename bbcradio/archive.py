@@ -0,0 +1,258 @@
+# encoding: utf-8
+
+"""bbcradio.archive
+----------------
+
+This module implements recording fetched pages to, and replaying fetched pages
+from, a single archive file.
+
+An archive is a zip file with one deflate-compressed member per URL. The
+member is named by a hash of the URL and its comment holds the URL, status,
+encoding and response headers as JSON. The body is stored decoded, so headers
+describing its transfer encoding are dropped. The zip central directory acts
+as the index: it is read once on opening and gives constant time lookup by
+URL.
+
+Copyright (c) 2021 Steven Maude
+Licensed under the MIT License, see LICENSE.
+"""
+
+import contextlib
+import hashlib
+import json
+import warnings
+import zipfile
+
+from requests.structures import CaseInsensitiveDict
+
+from . import api
+
+# Headers describing the body as sent, not the decoded body that is stored.
+_TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class ArchiveMissError(KeyError):
+    """Raised when a URL is not present in an archive being replayed."""
+
+    pass
+
+
+class ArchivedResponse:
+    """Represents a response replayed from an archive.
+
+    Provides the subset of the requests.Response interface that
+    get_htmlelement() uses.
+    """
+
+    def __init__(self, url, status_code, encoding, headers, content):
+        """Inits ArchivedResponse.
+
+        Arguments:
+            url: string, the requested URL.
+            status_code: integer, the HTTP status code.
+            encoding: string, the text encoding of content, or None.
+            headers: dict, mapping header name to value as strings.
+            content: bytes, the response body.
+        """
+        self.url = url
+        self.status_code = status_code
+        self.encoding = encoding
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+
+    @property
+    def text(self):
+        """Returns the response body decoded as a string."""
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        """Does nothing; only successful responses are recorded."""
+        pass
+
+
+def _recorded_headers(headers, content):
+    """Returns headers describing a decoded response body.
+
+    Arguments:
+        headers: mapping of header name to value, as received.
+        content: bytes, the decoded response body.
+
+    Returns:
+        dict, mapping header name to value, without Content-Encoding and
+        Transfer-Encoding, and with Content-Length matching content.
+    """
+    recorded = {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in _TRANSFER_HEADERS
+    }
+    recorded["Content-Length"] = str(len(content))
+    return recorded
+
+
+def _member_name(url):
+    """Returns the archive member name for a URL.
+
+    Arguments:
+        url: string, the URL.
+
+    Returns:
+        string, the member name.
+    """
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class ArchiveWriter:
+    """Appends fetched responses to an archive file."""
+
+    def __init__(self, path):
+        """Inits ArchiveWriter, creating the archive if it does not exist.
+
+        Arguments:
+            path: string or path-like, the archive path.
+        """
+        self._zipfile = zipfile.ZipFile(
+            path, mode="a", compression=zipfile.ZIP_DEFLATED
+        )
+
+    def add(self, response):
+        """Appends a response to the archive.
+
+        A URL that is already in the archive is recorded again; when
+        replaying, the most recently recorded response is used.
+
+        Arguments:
+            response: requests.Response or ArchivedResponse.
+        """
+        encoding = response.encoding
+        if encoding is None:
+            encoding = getattr(response, "apparent_encoding", None)
+
+        metadata = {
+            "url": response.url,
+            "status_code": response.status_code,
+            "encoding": encoding,
+            "headers": _recorded_headers(response.headers, response.content),
+        }
+        info = zipfile.ZipInfo(_member_name(response.url))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.comment = json.dumps(metadata).encode("utf-8")
+
+        with warnings.catch_warnings():
+            # zipfile warns on duplicate member names; these are expected.
+            warnings.simplefilter("ignore", UserWarning)
+            self._zipfile.writestr(info, response.content)
+
+    def fetch(self, url):
+        """Fetches a URL, records the response and returns it.
+
+        Arguments:
+            url: string, the URL.
+
+        Returns:
+            requests.Response for the requested page.
+        """
+        response = api.fetch(url)
+        # Record under the requested URL, not any redirected URL, so that
+        # replay finds it.
+        response.url = url
+        self.add(response)
+        return response
+
+    def close(self):
+        """Closes the archive, writing its index."""
+        self._zipfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ArchiveReader:
+    """Serves previously recorded responses from an archive file."""
+
+    def __init__(self, path):
+        """Inits ArchiveReader.
+
+        Arguments:
+            path: string or path-like, the archive path.
+        """
+        self._zipfile = zipfile.ZipFile(path, mode="r")
+
+    @property
+    def urls(self):
+        """Returns a list of the URLs in the archive, in recorded order."""
+        urls = []
+        for info in self._zipfile.infolist():
+            urls.append(json.loads(info.comment.decode("utf-8"))["url"])
+        return urls
+
+    def fetch(self, url):
+        """Returns the recorded response for a URL.
+
+        Arguments:
+            url: string, the URL.
+
+        Returns:
+            ArchivedResponse.
+
+        Raises:
+            ArchiveMissError: the URL is not in the archive.
+        """
+        try:
+            info = self._zipfile.getinfo(_member_name(url))
+        except KeyError:
+            raise ArchiveMissError(url)
+        metadata = json.loads(info.comment.decode("utf-8"))
+        return ArchivedResponse(content=self._zipfile.read(info), **metadata)
+
+    def __contains__(self, url):
+        try:
+            self._zipfile.getinfo(_member_name(url))
+        except KeyError:
+            return False
+        return True
+
+    def close(self):
+        """Closes the archive."""
+        self._zipfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextlib.contextmanager
+def record(path):
+    """Context manager that records every fetched page to an archive.
+
+    Arguments:
+        path: string or path-like, the archive path. Responses are
+            appended if the archive already exists.
+
+    Yields:
+        ArchiveWriter.
+    """
+    with ArchiveWriter(path) as writer, api.fetching_with(writer.fetch):
+        yield writer
+
+
+@contextlib.contextmanager
+def replay(path):
+    """Context manager that serves every fetched page from an archive.
+
+    No network requests are made; fetching a URL that is not in the
+    archive raises ArchiveMissError.
+
+    Arguments:
+        path: string or path-like, the archive path.
+
+    Yields:
+        ArchiveReader.
+    """
+    with ArchiveReader(path) as reader, api.fetching_with(reader.fetch):
+        yield reader
@@ -9,43 +9,58 @@ Copyright (c) 2021 Steven Maude
 Licensed under the MIT License, see LICENSE.
 """
 import argparse
+import contextlib
 import sys
 
 import bbcradio
+import bbcradio.analytics
+import bbcradio.archive
+import bbcradio.export
 import requests
 
 
-def list_stations():
+def list_stations(base_url=None):
     """Retrieves a list of radio stations and prints them.
 
     Arguments:
-        None.
+        base_url: string, a site URL to use instead of the BBC site.
+            Defaults to None.
 
     Returns:
         None.
     """
-    stations = bbcradio.Stations()
+    stations = bbcradio.Stations(base_url=base_url)
     for name, url in stations.urls.items():
         print(f"{name} {url}")
 
 
-def retrieve_schedule(station_name, date):
+def retrieve_schedule(station_name, date, base_url=None):
     """Retrieves and prints a schedule for a station on a given date.
 
     Arguments:
         station_name: string, radio station name.
         date: string, date in YYYY-MM-DD format.
+        base_url: string, a site URL to use instead of the BBC site.
+            Defaults to None.
 
     Returns:
         None.
     """
-    stations = bbcradio.Stations()
-    station = stations.select(station_name)
+    stations = bbcradio.Stations(base_url=base_url)
+    try:
+        station = stations.select(station_name)
+    except bbcradio.InvalidStationError as e:
+        print(f"Unknown station: {e}")
+        sys.exit(1)
 
     schedule = bbcradio.Schedule(station, date)
     try:
         schedule.programmes
-    except (requests.exceptions.HTTPError, ValueError):
+    except (
+        requests.exceptions.HTTPError,
+        ValueError,
+        bbcradio.archive.ArchiveMissError,
+    ):
         print(f"Unable to retrieve schedule for {station_name} on {date}.")
         sys.exit(1)
 
@@ -66,8 +81,171 @@ def retrieve_schedule(station_name, date):
         print(p["url"])
 
 
+def print_stats(station_name, start_date, end_date, base_url=None):
+    """Retrieves schedules for a station over dates and prints statistics.
+
+    Arguments:
+        station_name: string, radio station name.
+        start_date: string, first date in YYYY-MM-DD format.
+        end_date: string, last date in YYYY-MM-DD format.
+        base_url: string, a site URL to use instead of the BBC site.
+            Defaults to None.
+
+    Returns:
+        None.
+    """
+    stations = bbcradio.Stations(base_url=base_url)
+    try:
+        station = stations.select(station_name)
+    except bbcradio.InvalidStationError as e:
+        print(f"Unknown station: {e}")
+        sys.exit(1)
+
+    try:
+        multiday_schedule = bbcradio.MultiDaySchedule.for_dates(
+            station, start_date, end_date
+        )
+    except bbcradio.InvalidDateError as e:
+        print(f"Invalid dates: {e}")
+        sys.exit(1)
+
+    try:
+        table = bbcradio.analytics.ProgrammeTable.from_schedules(
+            multiday_schedule.schedules(station)
+        )
+    except (
+        requests.exceptions.HTTPError,
+        ValueError,
+        bbcradio.archive.ArchiveMissError,
+    ):
+        print(
+            f"Unable to retrieve schedules for {station_name} "
+            f"from {start_date} to {end_date}."
+        )
+        sys.exit(1)
+
+    print(
+        f"Statistics for {station.name} from {start_date} to {end_date}: "
+        f"{len(table)} programmes"
+    )
+
+    print("* Airtime by series and week (hours)")
+    for (_, series_name, week), seconds in table.airtime().most_common():
+        series_name = series_name or "<No series name found>"
+        print(f"{week} {seconds / 3600:.1f} {series_name}")
+
+    print(f"* Repeats ({table.repeat_rate():.1%} of broadcasts)")
+    for (_, identifier), count in table.repeats().most_common():
+        print(f"{identifier} {count}")
+
+    print("* Busiest slots (programmes starting, UTC)")
+    weekdays = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    for (weekday, time), count in table.busiest_slots():
+        print(f"{weekdays[weekday]} {time} {count}")
+
+
+def _fetched_schedules(schedules):
+    """Yields schedules that can be fetched, reporting those that cannot.
+
+    Arguments:
+        schedules: iterable of Schedule.
+
+    Yields:
+        Schedule, with programmes already fetched.
+    """
+    for schedule in schedules:
+        try:
+            # Fetch and decode all programmes now, to report errors.
+            for _ in schedule:
+                pass
+        except (
+            requests.exceptions.HTTPError,
+            ValueError,
+            bbcradio.archive.ArchiveMissError,
+        ):
+            print(
+                f"Unable to retrieve schedule for {schedule.station.name} "
+                f"on {schedule.date}.",
+                file=sys.stderr,
+            )
+            continue
+        yield schedule
+
+
+def export_schedules(
+    export_format, start_date, end_date, station_names, path, base_url=None
+):
+    """Retrieves schedules over a date range and writes them as a guide.
+
+    Schedules are written as they are retrieved.
+
+    Arguments:
+        export_format: string, "xmltv" or "ical".
+        start_date: string, first date in YYYY-MM-DD format.
+        end_date: string, last date in YYYY-MM-DD format.
+        station_names: list of string, radio station names, or None for
+            all stations.
+        path: string, output file path, or None for standard output.
+        base_url: string, a site URL to use instead of the BBC site.
+            Defaults to None.
+
+    Returns:
+        None.
+    """
+    stations = bbcradio.Stations(base_url=base_url)
+    if station_names:
+        try:
+            selected = [stations.select(name) for name in station_names]
+        except bbcradio.InvalidStationError as e:
+            print(f"Unknown station: {e}")
+            sys.exit(1)
+    else:
+        selected = stations.stations
+
+    try:
+        dates = bbcradio.date_range(start_date, end_date)
+    except bbcradio.InvalidDateError as e:
+        print(f"Invalid dates: {e}")
+        sys.exit(1)
+
+    # Each schedule is created when needed and dropped once written, so
+    # memory use does not grow with the number of stations and dates.
+    schedules = _fetched_schedules(
+        bbcradio.Schedule(station, date)
+        for station in selected
+        for date in dates
+    )
+
+    def write(f):
+        if export_format == "xmltv":
+            bbcradio.export.write_xmltv(selected, schedules, f)
+        else:
+            bbcradio.export.write_icalendar(schedules, f)
+
+    if path is None:
+        write(sys.stdout)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            write(f)
+
+
 def main():
     parser = argparse.ArgumentParser(prog="bbcradio_cli")
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument(
+        "--record",
+        metavar="ARCHIVE",
+        help="record fetched pages to an archive file",
+    )
+    archive_group.add_argument(
+        "--replay",
+        metavar="ARCHIVE",
+        help="serve pages from an archive file instead of fetching them",
+    )
+    parser.add_argument(
+        "--base-url",
+        help="site URL to use instead of the BBC site, e.g. a fake server",
+    )
     subparsers = parser.add_subparsers(
         dest="subparser_name", help="sub-command help"
     )
@@ -84,12 +262,74 @@ def main():
         "date", help="date in YYYY-MM-DD format", type=str
     )
 
+    stats_parser = subparsers.add_parser(
+        "stats", help="show statistics for schedules over a date range"
+    )
+    stats_parser.add_argument(
+        "station_name", help="name of a station, e.g. BBC Radio 1", type=str
+    )
+    stats_parser.add_argument(
+        "start_date", help="first date in YYYY-MM-DD format", type=str
+    )
+    stats_parser.add_argument(
+        "end_date", help="last date in YYYY-MM-DD format", type=str
+    )
+
+    export_parser = subparsers.add_parser(
+        "export", help="export schedules over a date range as a guide"
+    )
+    export_parser.add_argument(
+        "format", help="guide format", choices=["xmltv", "ical"]
+    )
+    export_parser.add_argument(
+        "start_date", help="first date in YYYY-MM-DD format", type=str
+    )
+    export_parser.add_argument(
+        "end_date", help="last date in YYYY-MM-DD format", type=str
+    )
+    export_parser.add_argument(
+        "-s",
+        "--station",
+        action="append",
+        dest="station_names",
+        metavar="STATION_NAME",
+        help="name of a station to export, e.g. BBC Radio 1; may be "
+        "repeated; defaults to all stations",
+    )
+    export_parser.add_argument(
+        "-o", "--output", help="output file; defaults to standard output"
+    )
+
     args = parser.parse_args()
 
-    if args.subparser_name == "stations":
-        list_stations()
-    elif args.subparser_name == "schedule":
-        retrieve_schedule(args.station_name, args.date)
+    if args.record is not None:
+        context = bbcradio.archive.record(args.record)
+    elif args.replay is not None:
+        context = bbcradio.archive.replay(args.replay)
+    else:
+        context = contextlib.suppress()
+
+    with context:
+        if args.subparser_name == "stations":
+            list_stations(args.base_url)
+        elif args.subparser_name == "schedule":
+            retrieve_schedule(args.station_name, args.date, args.base_url)
+        elif args.subparser_name == "stats":
+            print_stats(
+                args.station_name,
+                args.start_date,
+                args.end_date,
+                args.base_url,
+            )
+        elif args.subparser_name == "export":
+            export_schedules(
+                args.format,
+                args.start_date,
+                args.end_date,
+                args.station_names,
+                args.output,
+                args.base_url,
+            )
 
 
 if __name__ == "__main__":
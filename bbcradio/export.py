@@ -0,0 +1,217 @@
+# encoding: utf-8
+
+"""bbcradio.export
+---------------
+
+This module implements exporting schedules as XMLTV and iCalendar.
+
+Output is generated incrementally, one programme at a time, so schedules can
+be written as they are fetched without holding a whole guide in memory.
+
+Copyright (c) 2021 Steven Maude
+Licensed under the MIT License, see LICENSE.
+"""
+
+import datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from .api import schedule_programmes
+
+_ICALENDAR_LINE_OCTETS = 75
+
+
+def _station_programmes(schedules):
+    """Yields each programme of schedules with its station.
+
+    Duplicates are removed by bbcradio.schedule_programmes().
+
+    Arguments:
+        schedules: iterable of Schedule, ordered by date for each station.
+
+    Yields:
+        tuple of Station and Programme.
+    """
+    for schedule, programmes in schedule_programmes(schedules):
+        for programme in programmes:
+            yield schedule.station, programme
+
+
+def _xmltv_time(value):
+    """Returns a datetime in XMLTV format, e.g. "20210123000000 +0000"."""
+    return value.strftime("%Y%m%d%H%M%S %z")
+
+
+def _xmltv_channel_id(station):
+    """Returns the XMLTV channel ID for a station, its service ID."""
+    return station.service_id
+
+
+def iter_xmltv(stations, schedules):
+    """Yields an XMLTV document for schedules, in pieces.
+
+    Arguments:
+        stations: iterable of Station, the channels in the guide; each
+            schedule's station should be one of these.
+        schedules: iterable of Schedule, ordered by date for each station.
+
+    Yields:
+        string, consecutive pieces of the document.
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<!DOCTYPE tv SYSTEM "xmltv.dtd">\n'
+    yield '<tv generator-info-name="bbcradio">\n'
+
+    for station in stations:
+        lines = [
+            f"  <channel id={quoteattr(_xmltv_channel_id(station))}>",
+            f"    <display-name>{escape(station.name)}</display-name>",
+        ]
+        if station.logo_url is not None:
+            lines.append(f"    <icon src={quoteattr(station.logo_url)}/>")
+        lines.append(f"    <url>{escape(station.url)}</url>")
+        lines.append("  </channel>\n")
+        yield "\n".join(lines)
+
+    for station, programme in _station_programmes(schedules):
+        info = programme.info
+        attributes = f"start={quoteattr(_xmltv_time(programme.start))}"
+        end = programme.end
+        if end is not None:
+            attributes += f" stop={quoteattr(_xmltv_time(end))}"
+        attributes += f" channel={quoteattr(_xmltv_channel_id(station))}"
+
+        title = info["series_name"] or info["name"] or ""
+        lines = [
+            f"  <programme {attributes}>",
+            f"    <title>{escape(title)}</title>",
+        ]
+        if info["name"] is not None and info["name"] != title:
+            lines.append(f"    <sub-title>{escape(info['name'])}</sub-title>")
+        if info["description"] is not None:
+            lines.append(f"    <desc>{escape(info['description'])}</desc>")
+        if info["url"] is not None:
+            lines.append(f"    <url>{escape(info['url'])}</url>")
+        lines.append("  </programme>\n")
+        yield "\n".join(lines)
+
+    yield "</tv>\n"
+
+
+def _icalendar_time(value):
+    """Returns a datetime in iCalendar UTC format, e.g. "20210123T000000Z"."""
+    return value.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _icalendar_text(value):
+    """Returns a string escaped for an iCalendar TEXT value."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _icalendar_line(line):
+    """Returns an iCalendar content line, folded and with a CRLF ending.
+
+    Lines longer than 75 octets are folded without splitting UTF-8
+    characters.
+
+    Arguments:
+        line: string, the unfolded content line.
+
+    Returns:
+        string.
+    """
+    parts = []
+    part = ""
+    part_octets = 0
+    for character in line:
+        octets = len(character.encode("utf-8"))
+        if part_octets + octets > _ICALENDAR_LINE_OCTETS:
+            parts.append(part)
+            # Continuation lines start with a space, which counts.
+            part = " "
+            part_octets = 1
+        part += character
+        part_octets += octets
+    parts.append(part)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def iter_icalendar(schedules, timestamp=None):
+    """Yields an iCalendar document for schedules, in pieces.
+
+    Each programme is an event located at its station.
+
+    Arguments:
+        schedules: iterable of Schedule, ordered by date for each station.
+        timestamp: datetime.datetime, timezone aware, the time the events
+            were created. Defaults to None, for the current time.
+
+    Yields:
+        string, consecutive pieces of the document.
+    """
+    if timestamp is None:
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
+    dtstamp = _icalendar_time(timestamp)
+
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield "PRODID:-//bbcradio//bbcradio//EN\r\n"
+
+    for station, programme in _station_programmes(schedules):
+        info = programme.info
+        start = _icalendar_time(programme.start)
+        summary = " - ".join(
+            value
+            for value in (info["series_name"], info["name"])
+            if value is not None
+        )
+
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{info['identifier'] or ''}-{start}@{station.service_id}",
+            f"DTSTAMP:{dtstamp}",
+            f"DTSTART:{start}",
+        ]
+        end = programme.end
+        if end is not None:
+            lines.append(f"DTEND:{_icalendar_time(end)}")
+        lines.append(f"SUMMARY:{_icalendar_text(summary)}")
+        if info["description"] is not None:
+            lines.append(f"DESCRIPTION:{_icalendar_text(info['description'])}")
+        lines.append(f"LOCATION:{_icalendar_text(station.name)}")
+        if info["url"] is not None:
+            lines.append(f"URL:{info['url']}")
+        lines.append("END:VEVENT")
+        yield "".join(_icalendar_line(line) for line in lines)
+
+    yield "END:VCALENDAR\r\n"
+
+
+def write_xmltv(stations, schedules, f):
+    """Writes an XMLTV document for schedules to a file incrementally.
+
+    Arguments:
+        stations: iterable of Station; see iter_xmltv().
+        schedules: iterable of Schedule; see iter_xmltv().
+        f: text file object, opened for writing.
+    """
+    for piece in iter_xmltv(stations, schedules):
+        f.write(piece)
+
+
+def write_icalendar(schedules, f, timestamp=None):
+    """Writes an iCalendar document for schedules to a file incrementally.
+
+    Arguments:
+        schedules: iterable of Schedule; see iter_icalendar().
+        f: text file object, opened for writing with newline="" so that
+            line endings are not translated.
+        timestamp: datetime.datetime; see iter_icalendar().
+    """
+    for piece in iter_icalendar(schedules, timestamp):
+        f.write(piece)
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+bbcradio.fakeserver
+-------------------
+This module implements a local HTTP server that imitates the BBC schedule
+pages, for testing and benchmarking the client without network access.
+
+The stations page is served as is from templates/stations.html. Schedule
+pages are generated for any station on that page and any date from
+templates/schedule.html, with its dates shifted to the requested date. The
+tests use the same pages as fixtures.
+
+Point the client at the server with Stations(base_url=...), or with the
+CLI --base-url option.
+
+Copyright (c) 2021 Steven Maude
+Licensed under the MIT License, see LICENSE.
+"""
+import argparse
+import datetime
+import gzip
+import hashlib
+import http.server
+import pathlib
+import random
+import re
+import socketserver
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from lxml import html
+
+from .api import Station, Stations
+
+# Installed with the package; also the test fixtures.
+DEFAULT_TEMPLATES_DIR = pathlib.Path(__file__).resolve().parent / "templates"
+
+# The date of the schedule.html template.
+_TEMPLATE_DATE = datetime.date(2021, 1, 23)
+_TEMPLATE_SERVICE_ID = "p00fzl86"
+_TEMPLATE_HEADING = (
+    f"{_TEMPLATE_DATE:%A} {_TEMPLATE_DATE.day} {_TEMPLATE_DATE:%B}"
+)
+# Dates, the schedule heading and the service ID are replaced in pages.
+_FIELD_PATTERN = re.compile(
+    r"(?<!\d)(\d{4})([-/])(\d{2})\2(\d{2})(?!\d)|"
+    + re.escape(_TEMPLATE_HEADING)
+    + "|"
+    + re.escape(_TEMPLATE_SERVICE_ID)
+)
+_SCHEDULE_PATH_PATTERN = re.compile(
+    r"^/schedules/(\w+)/(\d{4})/(\d{2})/(\d{2})/?$"
+)
+_CHUNK_SIZE = 16 * 1024
+
+# A page body, plain and gzipped, each with its own strong ETag.
+_Page = namedtuple("_Page", ["body", "etag", "gzip_body", "gzip_etag"])
+
+
+def _make_page(body):
+    """Returns a _Page for a page body.
+
+    Arguments:
+        body: bytes, the page body.
+
+    Returns:
+        _Page.
+    """
+    gzip_body = gzip.compress(body, compresslevel=1)
+    return _Page(body, _etag(body), gzip_body, _etag(gzip_body))
+
+
+def _etag(body):
+    """Returns a quoted ETag for a response body."""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _split_template(template):
+    """Splits the schedule page template at the fields to replace.
+
+    Splitting once means a page is rendered by joining strings, rather than
+    searching the whole template for each page.
+
+    Arguments:
+        template: string, the schedule.html template.
+
+    Returns:
+        tuple of list of string, the literal text between fields, and list
+        of fields: _TEMPLATE_SERVICE_ID, _TEMPLATE_HEADING, or a tuple of
+        datetime.date and date separator. There is one more literal than
+        there are fields.
+    """
+    literals = []
+    fields = []
+    position = 0
+    for match in _FIELD_PATTERN.finditer(template):
+        literals.append(template[position : match.start()])
+        position = match.end()
+        year, separator, month, day = match.groups()
+        if year is None:
+            fields.append(match.group())
+        else:
+            date = datetime.date(int(year), int(month), int(day))
+            fields.append((date, separator))
+    literals.append(template[position:])
+    return literals, fields
+
+
+class _ThreadingHTTPServer(
+    socketserver.ThreadingMixIn, http.server.HTTPServer
+):
+    """HTTPServer handling each request in a thread.
+
+    Equivalent to http.server.ThreadingHTTPServer, which needs Python 3.7.
+    """
+
+    daemon_threads = True
+    # Allow many concurrent connections from load tests.
+    request_queue_size = 1024
+
+
+class FakeServer:
+    """Serves fake BBC stations and schedule pages over HTTP."""
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        templates_dir=DEFAULT_TEMPLATES_DIR,
+        latency=0.0,
+        bandwidth=None,
+        error_rate=0.0,
+        etags=True,
+        gzip=True,
+        seed=None,
+        cache_size=16,
+    ):
+        """Inits FakeServer and binds its socket; see start().
+
+        Arguments:
+            host: string, the address to listen on.
+            port: integer, the port to listen on. Defaults to 0, for any
+                free port; see base_url.
+            templates_dir: string or path-like, the directory containing
+                stations.html and schedule.html. Defaults to the pages
+                installed with the package.
+            latency: float, seconds to wait before each response.
+            bandwidth: integer, maximum bytes per second for each response
+                body. Defaults to None, for no limit.
+            error_rate: float, between 0 and 1, the fraction of requests
+                that fail with a 503 response.
+            etags: boolean, whether to send ETags and answer matching
+                If-None-Match requests with 304 responses.
+            gzip: boolean, whether to gzip responses for clients that
+                accept it.
+            seed: integer, seed for choosing which requests fail. Defaults
+                to None, for a random seed.
+            cache_size: integer, the number of recently requested schedule
+                pages to keep rendered.
+
+        Attributes:
+            _pages: OrderedDict, mapping a tuple of service ID and date to
+                _Page, the most recently requested schedule pages last.
+
+        Raises:
+            OSError: a template could not be read.
+        """
+        templates_dir = pathlib.Path(templates_dir)
+        with open(templates_dir / "stations.html", "rb") as f:
+            stations_page = f.read()
+        self._stations_page = _make_page(stations_page)
+        with open(templates_dir / "schedule.html", "r", encoding="utf-8") as f:
+            template = f.read()
+        self._template_literals, self._template_fields = _split_template(
+            template
+        )
+
+        urls = Stations._extract(html.fromstring(stations_page))
+        self._service_ids = {
+            Station(name, url).service_id for name, url in urls.items()
+        }
+
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.etags = etags
+        self.gzip = gzip
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._cache_size = cache_size
+        self._pages = OrderedDict()
+        self._pages_lock = threading.Lock()
+
+        self._httpd = _ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.fake_server = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Returns the server's base URL, e.g. "http://127.0.0.1:8000"."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True
+        )
+        self._thread.start()
+
+    def serve_forever(self):
+        """Serves in the current thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _should_fail(self):
+        """Returns True if a request should fail, at error_rate."""
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def page(self, path):
+        """Returns the page body for a request path.
+
+        Arguments:
+            path: string, the request path.
+
+        Returns:
+            bytes, the page body, or None if there is no page at path.
+        """
+        page = self._page(path)
+        return page.body if page is not None else None
+
+    def _page(self, path):
+        """Returns the _Page for a request path, or None if there is none."""
+        if path.rstrip("/") == "/sounds/schedules":
+            return self._stations_page
+
+        match = _SCHEDULE_PATH_PATTERN.match(path)
+        if match is None:
+            return None
+        service_id = match.group(1)
+        if service_id not in self._service_ids:
+            return None
+        try:
+            date = datetime.date(*(int(part) for part in match.groups()[1:]))
+        except ValueError:
+            return None
+
+        key = (service_id, date)
+        with self._pages_lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                return page
+
+        # Rendered without the lock, so concurrent requests for a new page
+        # may each render it.
+        page = _make_page(self._schedule_page(service_id, date))
+        with self._pages_lock:
+            self._pages[key] = page
+            while len(self._pages) > self._cache_size:
+                self._pages.popitem(last=False)
+        return page
+
+    def _schedule_page(self, service_id, date):
+        """Returns the schedule page body for a station and date.
+
+        Every date in the template is shifted by the difference between
+        the template's date and the requested date.
+
+        Arguments:
+            service_id: string, the station service ID.
+            date: datetime.date, the schedule date.
+
+        Returns:
+            bytes.
+        """
+        shift = date - _TEMPLATE_DATE
+        heading = f"{date:%A} {date.day} {date:%B}"
+        shifted_dates = {}
+
+        pieces = [self._template_literals[0]]
+        for field, literal in zip(
+            self._template_fields, self._template_literals[1:]
+        ):
+            if field == _TEMPLATE_SERVICE_ID:
+                value = service_id
+            elif field == _TEMPLATE_HEADING:
+                value = heading
+            else:
+                value = shifted_dates.get(field)
+                if value is None:
+                    template_date, separator = field
+                    value = (template_date + shift).strftime(
+                        f"%Y{separator}%m{separator}%d"
+                    )
+                    shifted_dates[field] = value
+            pieces.append(value)
+            pieces.append(literal)
+        return "".join(pieces).encode("utf-8")
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Handles requests for a FakeServer."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server.fake_server
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server._should_fail():
+            self._send(503, b"")
+            return
+
+        page = server._page(self.path.split("?", 1)[0])
+        if page is None:
+            self._send(404, b"")
+            return
+
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        if server.gzip and "gzip" in accept_encoding:
+            body, etag = page.gzip_body, page.gzip_etag
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body, etag = page.body, page.etag
+        headers["Vary"] = "Accept-Encoding"
+
+        if server.etags:
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", headers)
+                return
+
+        self._send(200, body, headers)
+
+    def _send(self, status, body, headers=None):
+        """Sends a response, limited to the server's bandwidth.
+
+        Arguments:
+            status: integer, the HTTP status code.
+            body: bytes, the response body.
+            headers: dict, mapping header name to value. Defaults to None.
+        """
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        bandwidth = self.server.fake_server.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), _CHUNK_SIZE):
+            chunk = body[start : start + _CHUNK_SIZE]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bandwidth)
+
+    def log_message(self, format, *args):
+        # Logging every request would dominate load tests.
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="bbcradio_fakeserver")
+    parser.add_argument("--host", default="127.0.0.1", help="address")
+    parser.add_argument("--port", default=8000, type=int, help="port")
+    parser.add_argument(
+        "--templates-dir",
+        default=DEFAULT_TEMPLATES_DIR,
+        help="directory containing stations.html and schedule.html",
+    )
+    parser.add_argument(
+        "--latency",
+        default=0.0,
+        type=float,
+        help="seconds to wait before each response",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        default=None,
+        type=int,
+        help="maximum bytes per second for each response",
+    )
+    parser.add_argument(
+        "--error-rate",
+        default=0.0,
+        type=float,
+        help="fraction of requests that fail, between 0 and 1",
+    )
+    parser.add_argument(
+        "--no-etags", action="store_true", help="do not send ETags"
+    )
+    parser.add_argument(
+        "--no-gzip", action="store_true", help="do not gzip responses"
+    )
+    args = parser.parse_args()
+
+    server = FakeServer(
+        host=args.host,
+        port=args.port,
+        templates_dir=args.templates_dir,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        etags=not args.no_etags,
+        gzip=not args.no_gzip,
+    )
+    print(f"Serving on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+# encoding: utf-8
+
+"""bbcradio.snapshot
+-----------------
+
+This module implements a compact binary snapshot format for collections of
+schedules, read through a memory map.
+
+A snapshot file contains, in order:
+
+* a header: magic bytes, format version, and the count and offset of each
+  of the following sections;
+* a string index: the offset and length of each string in the string data;
+* string data: every distinct station name, URL, date and programme text,
+  UTF-8 encoded and stored once;
+* programme records: fixed width, holding start and end times as seconds
+  since the Unix epoch with UTC offsets, and string indexes;
+* a schedule index: for each station and date, the station's strings and
+  the range of that schedule's programme records.
+
+All integers are little-endian. A string index of 0xFFFFFFFF means None.
+
+Opening a snapshot only reads its header. Schedules and programmes are
+decoded from the memory map when accessed, and the memory map is shared
+between processes reading the same file.
+
+Copyright (c) 2021 Steven Maude
+Licensed under the MIT License, see LICENSE.
+"""
+
+import datetime
+import mmap
+import struct
+from collections.abc import Sequence
+
+from .api import Programme, Schedule, Station
+
+MAGIC = b"BBCRSNAP"
+VERSION = 1
+
+# Magic, version, then count and offset of string index, programme records
+# and schedule index; string data immediately follows the string index.
+_HEADER = struct.Struct("<8sH6xQQQQQQ")
+# Offset into string data, and length in bytes.
+_STRING = struct.Struct("<QI")
+# Start and end as epoch seconds, their UTC offsets in minutes, then string
+# indexes of series name, name, description, identifier and URL.
+_RECORD = struct.Struct("<qqhh5I")
+# String indexes of station name, URL, network type, logo URL and date, then
+# the first programme record and number of records.
+_SCHEDULE = struct.Struct("<5IQI")
+
+_NONE = 0xFFFFFFFF
+_NO_TIME = -0x8000000000000000
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a snapshot this module can read."""
+
+    pass
+
+
+class _StringTable:
+    """Interns strings while writing a snapshot."""
+
+    def __init__(self):
+        self._indexes = {}
+        self.values = []
+
+    def index(self, value):
+        """Returns the index for value, adding it if new; None is _NONE."""
+        if value is None:
+            return _NONE
+        index = self._indexes.get(value)
+        if index is None:
+            index = len(self.values)
+            self._indexes[value] = index
+            self.values.append(value)
+        return index
+
+
+def _pack_time(value):
+    """Returns epoch seconds and UTC offset in minutes for a datetime."""
+    if value is None:
+        return _NO_TIME, 0
+    offset = value.utcoffset() // datetime.timedelta(minutes=1)
+    return int(value.timestamp()), offset
+
+
+def _unpack_time(seconds, offset):
+    """Returns an ISO 8601 date/time string, the inverse of _pack_time()."""
+    if seconds == _NO_TIME:
+        return None
+    tz = datetime.timezone(datetime.timedelta(minutes=offset))
+    return datetime.datetime.fromtimestamp(seconds, tz).isoformat()
+
+
+def write_snapshot(schedules, path):
+    """Writes schedules to a snapshot file.
+
+    Programme start and end times are stored to the second, and written
+    back in ISO 8601 format with their original UTC offsets.
+
+    Arguments:
+        schedules: iterable of Schedule. Schedules not already fetched are
+            fetched.
+        path: string or path-like, the snapshot path.
+    """
+    strings = _StringTable()
+    records = bytearray()
+    index = bytearray()
+    record_count = 0
+    schedule_count = 0
+
+    for schedule in schedules:
+        first_record = record_count
+        for programme in schedule:
+            info = programme.info
+            start, start_offset = _pack_time(programme.start)
+            end, end_offset = _pack_time(programme.end)
+            records += _RECORD.pack(
+                start,
+                end,
+                start_offset,
+                end_offset,
+                strings.index(info["series_name"]),
+                strings.index(info["name"]),
+                strings.index(info["description"]),
+                strings.index(info["identifier"]),
+                strings.index(info["url"]),
+            )
+            record_count += 1
+
+        station = schedule.station
+        index += _SCHEDULE.pack(
+            strings.index(station.name),
+            strings.index(station.url),
+            strings.index(station.network_type),
+            strings.index(station.logo_url),
+            strings.index(schedule.date),
+            first_record,
+            record_count - first_record,
+        )
+        schedule_count += 1
+
+    string_index = bytearray()
+    string_data = bytearray()
+    for value in strings.values:
+        encoded = value.encode("utf-8")
+        string_index += _STRING.pack(len(string_data), len(encoded))
+        string_data += encoded
+
+    strings_offset = _HEADER.size
+    records_offset = strings_offset + len(string_index) + len(string_data)
+    index_offset = records_offset + len(records)
+
+    with open(path, "wb") as f:
+        f.write(
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(strings.values),
+                strings_offset,
+                record_count,
+                records_offset,
+                schedule_count,
+                index_offset,
+            )
+        )
+        f.write(string_index)
+        f.write(string_data)
+        f.write(records)
+        f.write(index)
+
+
+class SnapshotProgrammes(Sequence):
+    """A schedule's programmes in a snapshot, decoded on access."""
+
+    def __init__(self, reader, first_record, count):
+        """Inits SnapshotProgrammes.
+
+        Arguments:
+            reader: SnapshotReader.
+            first_record: integer, index of the first programme record.
+            count: integer, number of programme records.
+        """
+        self._reader = reader
+        self._first_record = first_record
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("programme index out of range")
+        return self._reader._programme(self._first_record + index)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"SnapshotProgrammes({list(self)!r})"
+
+
+class SnapshotReader:
+    """Reads schedules from a snapshot file through a memory map."""
+
+    def __init__(self, path):
+        """Inits SnapshotReader.
+
+        Arguments:
+            path: string or path-like, the snapshot path.
+
+        Attributes:
+            _index: dict, mapping a tuple of station name and date to
+                schedule index position. Set on first lookup.
+
+        Raises:
+            SnapshotError: the file is not a supported snapshot.
+        """
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"not a snapshot: {path}")
+
+        if len(self._mmap) < _HEADER.size:
+            self.close()
+            raise SnapshotError(f"not a snapshot: {path}")
+        (
+            magic,
+            version,
+            self._string_count,
+            self._strings_offset,
+            self._record_count,
+            self._records_offset,
+            self._schedule_count,
+            self._schedules_offset,
+        ) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotError(f"not a snapshot: {path}")
+        if version != VERSION:
+            self.close()
+            raise SnapshotError(f"unsupported snapshot version: {version}")
+
+        self._string_data_offset = (
+            self._strings_offset + self._string_count * _STRING.size
+        )
+        sections = [
+            (self._strings_offset, self._string_count, _STRING.size),
+            (self._records_offset, self._record_count, _RECORD.size),
+            (self._schedules_offset, self._schedule_count, _SCHEDULE.size),
+        ]
+        # String data lies between the string index and programme records.
+        if self._string_data_offset > self._records_offset or any(
+            offset + count * size > len(self._mmap)
+            for offset, count, size in sections
+        ):
+            self.close()
+            raise SnapshotError(f"truncated or corrupt snapshot: {path}")
+        self._index = None
+
+    def _string(self, index):
+        """Returns the string at an index in the string table, or None.
+
+        Raises:
+            SnapshotError: the string is outside the string data.
+        """
+        if index == _NONE:
+            return None
+        if index >= self._string_count:
+            raise SnapshotError(f"string index out of range: {index}")
+        offset, length = _STRING.unpack_from(
+            self._mmap, self._strings_offset + index * _STRING.size
+        )
+        start = self._string_data_offset + offset
+        if start + length > self._records_offset:
+            raise SnapshotError(f"string out of range: {index}")
+        try:
+            return self._mmap[start : start + length].decode("utf-8")
+        except UnicodeDecodeError:
+            raise SnapshotError(f"invalid string: {index}")
+
+    def _programme(self, record):
+        """Returns the Programme for a programme record index."""
+        (
+            start,
+            end,
+            start_offset,
+            end_offset,
+            series_name,
+            name,
+            description,
+            identifier,
+            url,
+        ) = _RECORD.unpack_from(
+            self._mmap, self._records_offset + record * _RECORD.size
+        )
+        return Programme(
+            start_date=_unpack_time(start, start_offset),
+            end_date=_unpack_time(end, end_offset),
+            series_name=self._string(series_name),
+            name=self._string(name),
+            description=self._string(description),
+            identifier=self._string(identifier),
+            url=self._string(url),
+        )
+
+    def _schedule_entry(self, position):
+        """Returns the schedule index entry at a position."""
+        return _SCHEDULE.unpack_from(
+            self._mmap, self._schedules_offset + position * _SCHEDULE.size
+        )
+
+    def _schedule(self, position):
+        """Returns the Schedule at a schedule index position."""
+        (
+            name,
+            url,
+            network_type,
+            logo_url,
+            date,
+            first_record,
+            count,
+        ) = self._schedule_entry(position)
+        if first_record + count > self._record_count:
+            raise SnapshotError(f"programme records out of range: {position}")
+        station = Station(
+            self._string(name),
+            self._string(url),
+            self._string(network_type),
+            self._string(logo_url),
+        )
+        return Schedule(
+            station,
+            self._string(date),
+            SnapshotProgrammes(self, first_record, count),
+        )
+
+    def __len__(self):
+        return self._schedule_count
+
+    def schedules(self):
+        """Yields the schedules in the snapshot, in the order written.
+
+        Yields:
+            Schedule, whose programmes are decoded on access.
+        """
+        for position in range(self._schedule_count):
+            yield self._schedule(position)
+
+    def schedule(self, station_name, date):
+        """Returns the schedule for a station and date.
+
+        Arguments:
+            station_name: string, the station name.
+            date: string, the date in YYYY-MM-DD format.
+
+        Returns:
+            Schedule, whose programmes are decoded on access.
+
+        Raises:
+            KeyError: there is no schedule for the station and date.
+        """
+        if self._index is None:
+            self._index = {}
+            for position in range(self._schedule_count):
+                name, _, _, _, entry_date, _, _ = self._schedule_entry(
+                    position
+                )
+                key = (self._string(name), self._string(entry_date))
+                self._index.setdefault(key, position)
+        return self._schedule(self._index[station_name, date])
+
+    def close(self):
+        """Closes the memory map.
+
+        Programmes of schedules from this reader cannot be accessed after.
+        """
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+benchmarks.bench_analytics
+--------------------------
+Times loading and aggregating synthetic programmes with
+bbcradio.analytics, to show how it scales with the number of programmes.
+
+Run from the repository root, e.g.:
+
+    python3 benchmarks/bench_analytics.py 100000 1000000 3000000
+
+Copyright (c) 2021 Steven Maude
+Licensed under the MIT License, see LICENSE.
+"""
+import random
+import sys
+import time
+
+import bbcradio.analytics
+
+# 2021-01-04T00:00:00+00:00, a Monday.
+START = 1609718400
+STATIONS = 57
+SERIES = 2000
+
+
+def build_table(count):
+    """Returns a ProgrammeTable of synthetic programmes.
+
+    Each station broadcasts back to back programmes of 30 to 180 minutes,
+    with roughly a third being repeats of earlier programmes.
+
+    Arguments:
+        count: integer, the number of programmes.
+
+    Returns:
+        ProgrammeTable.
+    """
+    rng = random.Random(0)
+    table = bbcradio.analytics.ProgrammeTable()
+    per_station = count // STATIONS + 1
+    for station in range(STATIONS):
+        station_name = f"Station {station}"
+        start = START
+        for n in range(min(per_station, count - len(table))):
+            end = start + rng.choice((30, 60, 90, 120, 180)) * 60
+            if n > 0 and rng.random() < 1 / 3:
+                identifier = f"s{station}p{rng.randrange(n)}"
+            else:
+                identifier = f"s{station}p{n}"
+            series_name = f"Series {rng.randrange(SERIES)}"
+            table.add(station_name, start, end, series_name, identifier)
+            start = end
+    return table
+
+
+def timed(function, *args):
+    """Returns the result of calling function and the time taken."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]
+    print("programmes  load/s  airtime/s  repeats/s  busiest_slots/s")
+    for count in counts:
+        table, load_time = timed(build_table, count)
+        _, airtime_time = timed(table.airtime)
+        _, repeats_time = timed(table.repeats)
+        _, slots_time = timed(table.busiest_slots)
+        print(
+            f"{len(table):>10}  {load_time:>6.2f}  {airtime_time:>9.2f}  "
+            f"{repeats_time:>9.2f}  {slots_time:>15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+benchmarks.bench_fakeserver
+---------------------------
+Measures how many schedule pages per second can be fetched and parsed from
+a local bbcradio.fakeserver, using concurrent clients.
+
+Run from the repository root, e.g.:
+
+    python3 benchmarks/bench_fakeserver.py 2000 16
+
+Copyright (c) 2021 Steven Maude
+Licensed under the MIT License, see LICENSE.
+"""
+
+import concurrent.futures
+import datetime
+import sys
+import threading
+import time
+
+import bbcradio
+import bbcradio.fakeserver
+import requests
+
+_local = threading.local()
+
+
+def fetch(url):
+    """Fetches a URL with a per-thread session, reusing connections."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    r = session.get(url, timeout=30)
+    r.raise_for_status()
+    return r
+
+
+def main():
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with bbcradio.fakeserver.FakeServer() as server:
+        stations = bbcradio.Stations(base_url=server.base_url).stations
+        start_date = datetime.date(2021, 1, 1)
+        schedules = [
+            bbcradio.Schedule(
+                stations[n % len(stations)],
+                (
+                    start_date + datetime.timedelta(n // len(stations))
+                ).isoformat(),
+            )
+            for n in range(requests_count)
+        ]
+
+        start = time.perf_counter()
+        with bbcradio.api.fetching_with(fetch):
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                for _ in executor.map(lambda s: s.programmes, schedules):
+                    pass
+        elapsed = time.perf_counter() - start
+
+    print(
+        f"{requests_count} schedules with {workers} workers in "
+        f"{elapsed:.2f} s: {requests_count / elapsed:.0f} schedules/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
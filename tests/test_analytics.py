@@ -0,0 +1,98 @@
+import pathlib
+import unittest
+
+import bbcradio
+import bbcradio.analytics
+from lxml import html
+
+
+class TestProgrammeTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        path = pathlib.Path("bbcradio") / "templates" / "schedule.html"
+        with open(path, "r") as f:
+            page_element = html.fromstring(f.read())
+
+        station = bbcradio.Station(
+            "BBC Unittest Station", "https://example.com/unittest"
+        )
+        cls.schedule = bbcradio.Schedule(station, "2021-01-23")
+        cls.schedule._programmes = bbcradio.Schedule._extract(page_element)
+
+    def test_from_schedules(self):
+        table = bbcradio.analytics.ProgrammeTable.from_schedules(
+            [self.schedule]
+        )
+        self.assertEqual(22, len(table))
+        # 2021-01-23T00:00:00+00:00
+        self.assertEqual(1611360000, table.starts[0])
+        # 2021-01-23T02:00:00+00:00
+        self.assertEqual(1611367200, table.ends[0])
+
+    def test_duplicate_programmes_stored_once(self):
+        table = bbcradio.analytics.ProgrammeTable.from_schedules(
+            [self.schedule, self.schedule]
+        )
+        self.assertEqual(22, len(table))
+
+    def test_overlapping_schedules(self):
+        next_schedule = bbcradio.Schedule(self.schedule.station, "2021-01-24")
+        next_schedule._programmes = self.schedule._programmes[-5:] + [
+            bbcradio.Programme(
+                start_date="2021-01-24T06:30:00+00:00",
+                end_date="2021-01-24T07:00:00+00:00",
+                identifier="unittest1",
+            )
+        ]
+        table = bbcradio.analytics.ProgrammeTable.from_schedules(
+            [self.schedule, next_schedule]
+        )
+        self.assertEqual(23, len(table))
+
+    def test_add_stores_every_programme(self):
+        table = bbcradio.analytics.ProgrammeTable()
+        table.add("Station", 0, 3600, "Series", "a")
+        table.add("Station", 0, 3600, "Series", "a")
+        self.assertEqual(2, len(table))
+
+    def test_airtime(self):
+        table = bbcradio.analytics.ProgrammeTable()
+        # Monday 2021-01-18 and Sunday 2021-01-24, then Monday 2021-01-25.
+        table.add("Station", 1610928000, 1610931600, "Series", "a")
+        table.add("Station", 1611446400, 1611448200, "Series", "b")
+        table.add("Station", 1611532800, 1611536400, "Series", "c")
+        table.add("Station", 1611532800, None, "Other", "d")
+
+        self.assertEqual(
+            {
+                ("Station", "Series", "2021-01-18"): 5400,
+                ("Station", "Series", "2021-01-25"): 3600,
+                ("Station", "Other", "2021-01-25"): 0,
+            },
+            dict(table.airtime()),
+        )
+
+    def test_repeats(self):
+        table = bbcradio.analytics.ProgrammeTable()
+        table.add("Station", 0, 3600, "Series", "a")
+        table.add("Station", 7200, 10800, "Series", "a")
+        table.add("Other Station", 0, 3600, "Series", "a")
+        table.add("Station", 3600, 7200, "Series", "b")
+
+        # The broadcast on Other Station is a simulcast, not a repeat.
+        self.assertEqual({("Station", "a"): 2}, dict(table.repeats()))
+        self.assertEqual(0.25, table.repeat_rate())
+
+    def test_busiest_slots(self):
+        table = bbcradio.analytics.ProgrammeTable.from_schedules(
+            [self.schedule]
+        )
+        # Saturday 2021-01-23 has one programme starting each hour, apart
+        # from 03:00 and 10:00, which have two.
+        self.assertEqual(
+            [((5, "03:00"), 2), ((5, "10:00"), 2)],
+            table.busiest_slots(n=2),
+        )
+        self.assertEqual(
+            [((5, "00:00"), 6)], table.busiest_slots(n=1, slot_minutes=360)
+        )
@@ -1,6 +1,10 @@
+import datetime
+import json
 import pathlib
+import pickle
 import unittest
 from collections import OrderedDict
+from unittest import mock
 
 import bbcradio
 from lxml import html
@@ -9,11 +13,12 @@ from lxml import html
 class TestStations(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        path = pathlib.Path("tests") / "fixtures" / "stations.html"
+        path = pathlib.Path("bbcradio") / "templates" / "stations.html"
         with open(path, "r") as f:
             page_element = html.fromstring(f.read())
 
         cls.urls = bbcradio.Stations._extract(page_element)
+        cls.records = bbcradio.Stations._extract_records(page_element)
 
     def test_correct_extracted_links(self):
         # NB: these links are relative as it is the get_htmlelement() helper
@@ -96,11 +101,76 @@ class TestStations(unittest.TestCase):
             "BBC Radio Not Present",
         )
 
+    def test_correct_extracted_records(self):
+        self.assertEqual(
+            list(self.urls.items()), [r[:2] for r in self.records]
+        )
+        self.assertEqual(
+            (
+                "BBC Radio 1",
+                "/schedules/p00fzl86",
+                "national",
+                "https://rmp.files.bbci.co.uk/rmp-shared-assets/1.4.0/img/"
+                "network-logos/national/bbc_radio_one_colour.svg",
+            ),
+            self.records[0],
+        )
+        network_types = {r[0]: r[2] for r in self.records}
+        self.assertEqual("nation", network_types["BBC Radio Wales"])
+        self.assertEqual("local", network_types["BBC Radio York"])
+
+    def test_select_with_metadata(self):
+        stations = bbcradio.Stations.from_records(self.records)
+        station = stations.select("BBC Radio Wales")
+        self.assertEqual("p00fzl8y", station.service_id)
+        self.assertEqual("nation", station.network_type)
+        self.assertTrue(
+            station.logo_url.endswith("bbc_radio_wales_colour.svg")
+        )
+
+    def test_records_round_trip(self):
+        stations = bbcradio.Stations.from_records(self.records)
+        serialised = json.dumps(stations.records)
+        restored = bbcradio.Stations.from_records(json.loads(serialised))
+        self.assertEqual(stations, restored)
+        self.assertEqual(self.records, restored.records)
+
+    def test_records_without_metadata(self):
+        stations = bbcradio.Stations(self.urls)
+        self.assertEqual(
+            ("BBC Radio 1", "/schedules/p00fzl86", None, None),
+            stations.records[0],
+        )
+
+    def test_select_normalised_name(self):
+        stations = bbcradio.Stations(self.urls)
+        station = stations.select("bbc radio NAN gaidheal")
+        self.assertEqual(
+            bbcradio.Station("BBC Radio nan Gàidheal", "/schedules/p00fzl81"),
+            station,
+        )
+
+    def test_select_aliases(self):
+        stations = bbcradio.Stations(self.urls)
+        for alias in ["Radio 1", "R1", "r1", "p00fzl86"]:
+            with self.subTest(alias=alias):
+                self.assertEqual(
+                    bbcradio.Station("BBC Radio 1", "/schedules/p00fzl86"),
+                    stations.select(alias),
+                )
+        self.assertEqual("BBC Radio 4 Extra", stations.select("R4 Extra").name)
+
+    def test_incorrect_select_suggestions(self):
+        stations = bbcradio.Stations(self.urls)
+        with self.assertRaises(bbcradio.InvalidStationError) as cm:
+            stations.select("BBC Radio 5 lve")
+        self.assertEqual("BBC Radio 5 live", cm.exception.suggestions[0])
+
 
 class TestSchedule(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        path = pathlib.Path("tests") / "fixtures" / "schedule.html"
+        path = pathlib.Path("bbcradio") / "templates" / "schedule.html"
         with open(path, "r") as f:
             page_element = html.fromstring(f.read())
 
@@ -123,6 +193,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T00:00:00+00:00",
+                    "end_date": "2021-01-23T02:00:00+00:00",
                     "series_name": "Radio 1's Essential Mix",
                     "name": "Vintage Culture",
                     "description": "The Brazilian superstar DJ takes control of the Essential Mix decks.",
@@ -133,6 +204,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T02:00:00+00:00",
+                    "end_date": "2021-01-23T03:00:00+00:00",
                     "series_name": "Radio 1 Dance Presents...",
                     "name": "DJ Mag: Nightwave",
                     "description": "DJ Mag takes us to Scotland for an hour of bass, techno and blistering acid with Nightwave",
@@ -143,6 +215,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T03:00:00+00:00",
+                    "end_date": "2021-01-23T03:30:00+00:00",
                     "series_name": "Annie Mac in the Mix",
                     "name": "Piano House!",
                     "description": "Annie celebrates all things Piano house, old and new!",
@@ -153,6 +226,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T03:30:00+00:00",
+                    "end_date": "2021-01-23T04:00:00+00:00",
                     "series_name": "Annie Mac in the Mix",
                     "name": "House and Disco!",
                     "description": "Annie serves up another special mix.",
@@ -163,6 +237,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T04:00:00+00:00",
+                    "end_date": "2021-01-23T05:00:00+00:00",
                     "series_name": "Radio 1's Wind Down Presents...",
                     "name": "Intergral Records: Phil.Osophy",
                     "description": "Music designed to unwind the mind.",
@@ -173,6 +248,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T05:00:00+00:00",
+                    "end_date": "2021-01-23T06:00:00+00:00",
                     "series_name": "The Happy Hour from Radio 1",
                     "name": "Feel Good Happy Tunes!",
                     "description": "Feel good and happy tunes that will keep you smiling during lockdown life!",
@@ -183,6 +259,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T06:00:00+00:00",
+                    "end_date": "2021-01-23T07:00:00+00:00",
                     "series_name": "Radio 1 Dance",
                     "name": "24/7 Dance...",
                     "description": "Classic hits and the best new dance tracks.",
@@ -193,6 +270,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T07:00:00+00:00",
+                    "end_date": "2021-01-23T10:00:00+00:00",
                     "series_name": "Adele Roberts",
                     "name": "23/01/2021",
                     "description": "Adele Roberts takes charge of your weekend wake-up...",
@@ -203,6 +281,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T10:00:00+00:00",
+                    "end_date": "2021-01-23T10:32:00+00:00",
                     "series_name": "Radio 1 Anthems",
                     "name": "with Adele Roberts",
                     "description": "Big anthems and tunes you haven't heard in ages!",
@@ -213,6 +292,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T10:32:00+00:00",
+                    "end_date": "2021-01-23T11:00:00+00:00",
                     "series_name": "Radio 1 Anthems",
                     "name": "with Jordan North",
                     "description": "Big anthems and tunes you haven't heard in ages!",
@@ -223,6 +303,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T11:00:00+00:00",
+                    "end_date": "2021-01-23T13:00:00+00:00",
                     "series_name": "Jordan North",
                     "name": "23/01/2021",
                     "description": "Big hits and the best new music.",
@@ -233,6 +314,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T13:00:00+00:00",
+                    "end_date": "2021-01-23T16:00:00+00:00",
                     "series_name": "Matt and Mollie",
                     "name": "23/01/2021",
                     "description": "Afternoon fun and games with Matt Edmondson and Mollie King",
@@ -243,6 +325,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T16:00:00+00:00",
+                    "end_date": "2021-01-23T17:00:00+00:00",
                     "series_name": "Radio 1's Dance Anthems",
                     "name": "Classic Dance Anthems with Charlie Hedges",
                     "description": "Charlie crosses the spectrum of Dance music with tracks from Mella Dee, Otto Knows & Mylo.",
@@ -253,6 +336,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T17:00:00+00:00",
+                    "end_date": "2021-01-23T18:00:00+00:00",
                     "series_name": "Radio 1's Dance Anthems",
                     "name": "Classic Dance Anthems with Charlie Hedges",
                     "description": "Charlie continues the party with anthems from Patrick Topping, Weiss and The Prodigy.",
@@ -263,6 +347,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T18:00:00+00:00",
+                    "end_date": "2021-01-23T19:00:00+00:00",
                     "series_name": "Radio 1's Dance Anthems",
                     "name": "Today's Dance Anthems with Charlie Hedges",
                     "description": "Charlie mixes up the biggest Dance Anthems.",
@@ -273,6 +358,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T19:00:00+00:00",
+                    "end_date": "2021-01-23T21:00:00+00:00",
                     "series_name": "1Xtra's Takeover with DJ Target",
                     "name": "Kenny sits in for Target with a 50 Cent Versus Mix",
                     "description": "Kenny Allstar is in for Target as 1Xtra takes over Radio 1!",
@@ -283,6 +369,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T21:00:00+00:00",
+                    "end_date": "2021-01-23T23:00:00+00:00",
                     "series_name": "1Xtra's Rap Show with Tiffany Calver",
                     "name": "Fredo Street Heat",
                     "description": "All the latest hits and heat from the world of Rap plus Fredo is this weeks street heat.",
@@ -293,6 +380,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-23T23:00:00+00:00",
+                    "end_date": "2021-01-24T01:00:00+00:00",
                     "series_name": "Diplo and Friends",
                     "name": "Diplo in the Mix",
                     "description": "Diplo in the mix exclusively for Diplo and friends - only on Radio 1 and 1Xtra.",
@@ -303,6 +391,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-24T01:00:00+00:00",
+                    "end_date": "2021-01-24T03:00:00+00:00",
                     "series_name": "Radio 1's Classic Essential Mix",
                     "name": "Four Tet 2010",
                     "description": "Relive Four Tet's Essential Mix debut from 2010.",
@@ -313,6 +402,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-24T03:00:00+00:00",
+                    "end_date": "2021-01-24T04:00:00+00:00",
                     "series_name": "Danny Howard's Club Mix",
                     "name": "Episode 2",
                     "description": "Danny goes in with a another Feel Good Club Mix.",
@@ -323,6 +413,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-24T04:00:00+00:00",
+                    "end_date": "2021-01-24T05:00:00+00:00",
                     "series_name": "Radio 1's Dance Anthems",
                     "name": "Classic Dance Anthems with Charlie Hedges",
                     "description": "Non-stop Classic Dance Anthems with Charlie!",
@@ -333,6 +424,7 @@ class TestSchedule(unittest.TestCase):
             bbcradio.Programme(
                 **{
                     "start_date": "2021-01-24T05:00:00+00:00",
+                    "end_date": "2021-01-24T06:00:00+00:00",
                     "series_name": "Radio 1's Wind Down Presents...",
                     "name": "Integral: Emma G & MC Tali",
                     "description": "Integral's Emma G & MC Tali provide the Wind Down Mix.",
@@ -344,6 +436,36 @@ class TestSchedule(unittest.TestCase):
 
         self.assertEqual(expected_programmes, self.programmes)
 
+    def test_iter_programmes_decodes_lazily(self):
+        path = pathlib.Path("bbcradio") / "templates" / "schedule.html"
+        with open(path, "r") as f:
+            page_element = html.fromstring(f.read())
+        station = bbcradio.Station(
+            "BBC Unittest Station", "https://example.com/unittest"
+        )
+        schedule = bbcradio.Schedule(station, "2021-01-23")
+
+        with mock.patch(
+            "bbcradio.api.get_htmlelement", return_value=page_element
+        ) as get_htmlelement:
+            with mock.patch.object(
+                bbcradio.Schedule,
+                "_decode",
+                side_effect=bbcradio.Schedule._decode,
+            ) as decode:
+                self.assertEqual(self.programmes[0], next(iter(schedule)))
+                self.assertEqual(1, decode.call_count)
+                self.assertIsNone(schedule._programmes)
+
+                self.assertEqual(self.programmes, list(schedule))
+                self.assertEqual(self.programmes, schedule._programmes)
+                self.assertEqual(self.programmes, schedule.programmes)
+
+        # The schedule is only fetched once.
+        get_htmlelement.assert_called_once_with(
+            "https://example.com/unittest/2021/01/23"
+        )
+
     def test_create_with_valid_date(self):
         station = bbcradio.Station(
             "BBC Unittest Station", "https://example.com/unittest"
@@ -368,6 +490,7 @@ class TestProgramme(unittest.TestCase):
     def test_create_with_all_valid_values(self):
         info = {
             "start_date": "2021-01-24T05:00:00+00:00",
+            "end_date": "2021-01-24T06:00:00+00:00",
             "series_name": "Radio 1's Wind Down Presents...",
             "name": "Integral: Emma G & MC Tali",
             "description": "Integral's Emma G & MC Tali provide the Wind Down Mix.",
@@ -384,6 +507,7 @@ class TestProgramme(unittest.TestCase):
     def test_create_with_some_invalid_values(self):
         original_info = {
             "start_date": "2021-01-24T05:00:00+00:00",
+            "end_date": "2021-01-24T06:00:00+00:00",
             "series_name": "Radio 1's Wind Down Presents...",
             "name": "Integral: Emma G & MC Tali",
             "description": "Integral's Emma G & MC Tali provide the Wind Down Mix.",
@@ -398,3 +522,232 @@ class TestProgramme(unittest.TestCase):
         expected_programme._info = original_info
 
         self.assertEqual(expected_programme, programme)
+
+
+class TestMultiDaySchedule(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        path = pathlib.Path("bbcradio") / "templates" / "schedule.html"
+        with open(path, "r") as f:
+            page_element = html.fromstring(f.read())
+
+        cls.station = bbcradio.Station(
+            "BBC Unittest Station", "https://example.com/unittest"
+        )
+        cls.first_programmes = bbcradio.Schedule._extract(page_element)
+        # The following date's schedule repeats the previous night's
+        # programmes, then has a gap and an overlap.
+        cls.second_programmes = cls.first_programmes[-5:] + [
+            bbcradio.Programme(
+                start_date="2021-01-24T06:30:00+00:00",
+                end_date="2021-01-24T07:00:00+00:00",
+                identifier="unittest1",
+            ),
+            bbcradio.Programme(
+                start_date="2021-01-24T06:45:00+00:00",
+                end_date="2021-01-24T08:00:00+00:00",
+                identifier="unittest2",
+            ),
+        ]
+
+    def make_schedule(self, date, programmes):
+        schedule = bbcradio.Schedule(self.station, date)
+        schedule._programmes = programmes
+        return schedule
+
+    def make_multiday_schedule(self):
+        # Deliberately out of date order.
+        return bbcradio.MultiDaySchedule(
+            [
+                self.make_schedule("2021-01-24", self.second_programmes),
+                self.make_schedule("2021-01-23", self.first_programmes),
+            ]
+        )
+
+    def test_for_dates(self):
+        multiday_schedule = bbcradio.MultiDaySchedule.for_dates(
+            self.station, "2021-01-30", "2021-02-02"
+        )
+        self.assertEqual([self.station], multiday_schedule.stations)
+        self.assertEqual(
+            ["2021-01-30", "2021-01-31", "2021-02-01", "2021-02-02"],
+            [s.date for s in multiday_schedule.schedules(self.station)],
+        )
+
+    def test_for_dates_invalid_date(self):
+        self.assertRaises(
+            bbcradio.InvalidDateError,
+            bbcradio.MultiDaySchedule.for_dates,
+            self.station,
+            "2021-01-30",
+            "not-a-date",
+        )
+
+    def test_for_dates_reversed_range(self):
+        self.assertRaises(
+            bbcradio.InvalidDateError,
+            bbcradio.MultiDaySchedule.for_dates,
+            self.station,
+            "2021-02-02",
+            "2021-01-30",
+        )
+
+    def test_for_dates_single_date(self):
+        multiday_schedule = bbcradio.MultiDaySchedule.for_dates(
+            self.station, "2021-01-30", "2021-01-30"
+        )
+        self.assertEqual(
+            ["2021-01-30"],
+            [s.date for s in multiday_schedule.schedules(self.station)],
+        )
+
+    def test_timeline_removes_duplicates(self):
+        timeline = list(self.make_multiday_schedule().timeline(self.station))
+        self.assertEqual(
+            self.first_programmes + self.second_programmes[-2:], timeline
+        )
+
+    def test_timeline_window_does_not_fetch_later_dates(self):
+        later_schedule = bbcradio.Schedule(self.station, "2021-01-25")
+        multiday_schedule = bbcradio.MultiDaySchedule(
+            [
+                self.make_schedule("2021-01-23", self.first_programmes),
+                self.make_schedule("2021-01-24", self.second_programmes),
+                later_schedule,
+            ]
+        )
+        start = self.first_programmes[1].start
+        end = self.first_programmes[3].end
+        timeline = list(multiday_schedule.timeline(self.station, start, end))
+
+        self.assertEqual(self.first_programmes[1:4], timeline)
+        self.assertIsNone(later_schedule._programmes)
+
+    def test_timeline_invalid_station(self):
+        other_station = bbcradio.Station("Other", "https://example.com/other")
+        self.assertRaises(
+            bbcradio.InvalidStationError,
+            list,
+            self.make_multiday_schedule().timeline(other_station),
+        )
+
+    def test_schedule_programmes(self):
+        # A station with the same name but a different URL is separate.
+        other_station = bbcradio.Station(self.station.name, "https://x.com")
+        other_schedule = bbcradio.Schedule(other_station, "2021-01-24")
+        other_schedule._programmes = self.second_programmes
+        # The same start time with a different UTC offset is a duplicate.
+        self.assertEqual(
+            "2021-01-24T05:00:00+00:00",
+            self.first_programmes[-1].info["start_date"],
+        )
+        changed = bbcradio.Programme(
+            start_date="2021-01-24T06:00:00+01:00",
+            identifier=self.first_programmes[-1].info["identifier"],
+            description="Changed",
+        )
+
+        schedules = [
+            self.make_schedule("2021-01-23", self.first_programmes),
+            other_schedule,
+            self.make_schedule(
+                "2021-01-24", [changed] + self.second_programmes[-2:]
+            ),
+        ]
+        self.assertEqual(
+            [
+                (schedules[0], self.first_programmes),
+                (schedules[1], self.second_programmes),
+                (schedules[2], self.second_programmes[-2:]),
+            ],
+            list(bbcradio.schedule_programmes(schedules)),
+        )
+
+    def test_gaps(self):
+        self.assertEqual(
+            [(self.first_programmes[-1], self.second_programmes[-2])],
+            self.make_multiday_schedule().gaps(self.station),
+        )
+
+    def test_overlaps(self):
+        self.assertEqual(
+            [(self.second_programmes[-2], self.second_programmes[-1])],
+            self.make_multiday_schedule().overlaps(self.station),
+        )
+
+
+class TestProgrammeTimes(unittest.TestCase):
+    def test_start_and_end(self):
+        programme = bbcradio.Programme(
+            start_date="2021-06-24T05:00:00+01:00",
+            end_date="2021-06-24T06:00:00Z",
+        )
+        self.assertEqual(
+            datetime.datetime(2021, 6, 24, 4, tzinfo=datetime.timezone.utc),
+            programme.start,
+        )
+        self.assertEqual(
+            datetime.datetime(2021, 6, 24, 6, tzinfo=datetime.timezone.utc),
+            programme.end,
+        )
+
+    def test_missing_times(self):
+        programme = bbcradio.Programme()
+        self.assertIsNone(programme.start)
+        self.assertIsNone(programme.end)
+
+    def test_times_parsed_once(self):
+        programme = bbcradio.Programme(
+            start_date="2021-06-24T05:00:00+01:00",
+            end_date="2021-06-24T06:00:00+01:00",
+        )
+        with mock.patch(
+            "bbcradio.api._parse_datetime", wraps=bbcradio.api._parse_datetime
+        ) as parse_datetime:
+            for _ in range(3):
+                programme.start
+                programme.end
+        self.assertEqual(2, parse_datetime.call_count)
+
+    def test_unpickle_without_end_date(self):
+        # The pickled form of a Programme from before end dates were added.
+        programme = bbcradio.Programme.__new__(bbcradio.Programme)
+        programme.__dict__["_info"] = OrderedDict(
+            [
+                ("start_date", "2021-06-24T05:00:00+01:00"),
+                ("series_name", "Series"),
+                ("name", None),
+                ("description", None),
+                ("identifier", "p1"),
+                ("url", None),
+            ]
+        )
+        programme = pickle.loads(pickle.dumps(programme))
+
+        self.assertEqual(
+            datetime.datetime(2021, 6, 24, 4, tzinfo=datetime.timezone.utc),
+            programme.start,
+        )
+        self.assertIsNone(programme.end)
+        self.assertIsNone(programme.info["end_date"])
+        self.assertEqual(
+            bbcradio.Programme(
+                start_date="2021-06-24T05:00:00+01:00",
+                series_name="Series",
+                identifier="p1",
+            ),
+            programme,
+        )
+
+
+class TestFetchingWith(unittest.TestCase):
+    def test_restores_previous_fetch(self):
+        def fetch(url):
+            raise RuntimeError(url)
+
+        previous = bbcradio.api._fetch
+        with self.assertRaises(RuntimeError):
+            with bbcradio.api.fetching_with(fetch):
+                self.assertIs(fetch, bbcradio.api._fetch)
+                bbcradio.api.get_htmlelement("https://example.com")
+        self.assertIs(previous, bbcradio.api._fetch)
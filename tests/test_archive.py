@@ -0,0 +1,131 @@
+import pathlib
+import tempfile
+import unittest
+
+import bbcradio
+import bbcradio.archive
+import bbcradio.fakeserver
+
+
+class TestArchive(unittest.TestCase):
+    stations_url = "https://example.com/sounds/schedules"
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = pathlib.Path(tmpdir.name) / "archive.zip"
+
+        template_path = (
+            pathlib.Path("bbcradio") / "templates" / "stations.html"
+        )
+        with open(template_path, "rb") as f:
+            self.content = f.read()
+
+        response = bbcradio.archive.ArchivedResponse(
+            url=self.stations_url,
+            status_code=200,
+            encoding="utf-8",
+            headers={"Content-Type": "text/html; charset=utf-8"},
+            content=self.content,
+        )
+        with bbcradio.archive.ArchiveWriter(self.path) as writer:
+            writer.add(response)
+
+    def test_replay_response(self):
+        with bbcradio.archive.ArchiveReader(self.path) as reader:
+            self.assertIn(self.stations_url, reader)
+            self.assertEqual([self.stations_url], reader.urls)
+            response = reader.fetch(self.stations_url)
+
+        self.assertEqual(self.content, response.content)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            "text/html; charset=utf-8", response.headers["content-type"]
+        )
+
+    def test_replay_stations(self):
+        with bbcradio.archive.replay(self.path):
+            stations = bbcradio.Stations()
+            stations._stations_url = self.stations_url
+            station = stations.select("BBC Radio 1")
+
+        self.assertEqual(
+            bbcradio.Station(
+                "BBC Radio 1", "https://example.com/schedules/p00fzl86"
+            ),
+            station,
+        )
+
+    def test_replay_missing_url(self):
+        with bbcradio.archive.replay(self.path):
+            self.assertRaises(
+                bbcradio.archive.ArchiveMissError,
+                bbcradio.api.get_htmlelement,
+                "https://example.com/not-recorded",
+            )
+
+    def test_record_decoded_headers(self):
+        response = bbcradio.archive.ArchivedResponse(
+            url=self.stations_url,
+            status_code=200,
+            encoding="utf-8",
+            headers={
+                "Content-Type": "text/html; charset=utf-8",
+                "Content-Encoding": "gzip",
+                "Content-Length": "12",
+                "Transfer-Encoding": "chunked",
+            },
+            content=self.content,
+        )
+        with bbcradio.archive.ArchiveWriter(self.path) as writer:
+            writer.add(response)
+
+        with bbcradio.archive.ArchiveReader(self.path) as reader:
+            headers = reader.fetch(self.stations_url).headers
+
+        self.assertEqual("text/html; charset=utf-8", headers["content-type"])
+        self.assertEqual(str(len(self.content)), headers["content-length"])
+        self.assertNotIn("content-encoding", headers)
+        self.assertNotIn("transfer-encoding", headers)
+
+    def test_append_replaces_url(self):
+        response = bbcradio.archive.ArchivedResponse(
+            url=self.stations_url,
+            status_code=200,
+            encoding="utf-8",
+            headers={},
+            content=b"<html></html>",
+        )
+        with bbcradio.archive.ArchiveWriter(self.path) as writer:
+            writer.add(response)
+
+        with bbcradio.archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(
+                b"<html></html>", reader.fetch(self.stations_url).content
+            )
+
+    def test_record_and_replay_server(self):
+        path = self.path.with_name("recorded.zip")
+        with bbcradio.fakeserver.FakeServer() as server:
+            with bbcradio.archive.record(path):
+                stations = bbcradio.Stations(base_url=server.base_url)
+                station = stations.select("BBC Radio 2")
+                recorded = bbcradio.Schedule(station, "2021-03-01").programmes
+            schedule_url = server.base_url + "/schedules/p00fzl8v/2021/03/01"
+
+        with bbcradio.archive.replay(path) as reader:
+            self.assertEqual(
+                [stations._stations_url, schedule_url], reader.urls
+            )
+            response = reader.fetch(schedule_url)
+            self.assertNotIn("content-encoding", response.headers)
+            self.assertEqual(
+                str(len(response.content)), response.headers["content-length"]
+            )
+
+            stations = bbcradio.Stations(base_url=server.base_url)
+            station = stations.select("BBC Radio 2")
+            replayed = bbcradio.Schedule(station, "2021-03-01").programmes
+
+        self.assertEqual(22, len(replayed))
+        self.assertEqual(recorded, replayed)
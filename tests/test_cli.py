@@ -0,0 +1,63 @@
+import gc
+import io
+import pathlib
+import unittest
+import weakref
+from contextlib import redirect_stdout
+from unittest import mock
+
+import bbcradio
+import bbcradio.cli
+import bbcradio.export
+from lxml import html
+
+
+class TestExportSchedules(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        templates_path = pathlib.Path("bbcradio") / "templates"
+        with open(templates_path / "stations.html", "r") as f:
+            cls.stations_element = html.fromstring(f.read())
+        with open(templates_path / "schedule.html", "r") as f:
+            cls.schedule_element = html.fromstring(f.read())
+
+    def get_htmlelement(self, url):
+        if url.endswith("/sounds/schedules"):
+            return self.stations_element
+        return self.schedule_element
+
+    def test_earlier_schedules_not_retained(self):
+        schedule_programmes = bbcradio.export.schedule_programmes
+        schedule_refs = []
+
+        def tracked(schedules):
+            for schedule in schedules:
+                gc.collect()
+                # The consumer may still refer to the previous schedule.
+                for schedule_ref in schedule_refs[:-1]:
+                    self.assertIsNone(schedule_ref())
+                schedule_refs.append(weakref.ref(schedule))
+                yield schedule
+
+        def checked_schedule_programmes(schedules):
+            return schedule_programmes(tracked(schedules))
+
+        stdout = io.StringIO()
+        with mock.patch(
+            "bbcradio.api.get_htmlelement", side_effect=self.get_htmlelement
+        ):
+            with mock.patch(
+                "bbcradio.export.schedule_programmes",
+                side_effect=checked_schedule_programmes,
+            ):
+                with redirect_stdout(stdout):
+                    bbcradio.cli.export_schedules(
+                        "ical",
+                        "2021-01-23",
+                        "2021-01-27",
+                        ["BBC Radio 1", "BBC Radio 2"],
+                        None,
+                    )
+
+        self.assertEqual(10, len(schedule_refs))
+        self.assertTrue(stdout.getvalue().startswith("BEGIN:VCALENDAR"))
@@ -0,0 +1,97 @@
+import datetime
+import io
+import pathlib
+import unittest
+import xml.etree.ElementTree as ET
+
+import bbcradio
+import bbcradio.export
+from lxml import html
+
+
+class TestExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        path = pathlib.Path("bbcradio") / "templates" / "schedule.html"
+        with open(path, "r") as f:
+            page_element = html.fromstring(f.read())
+
+        cls.station = bbcradio.Station(
+            "BBC Radio 1",
+            "https://www.bbc.co.uk/schedules/p00fzl86",
+            "national",
+            "https://example.com/bbc_radio_one_colour.svg",
+        )
+        cls.programmes = bbcradio.Schedule._extract(page_element)
+
+    def make_schedule(self, date, programmes):
+        schedule = bbcradio.Schedule(self.station, date)
+        schedule._programmes = programmes
+        return schedule
+
+    def make_schedules(self):
+        # The second schedule repeats the last five programmes of the first.
+        return [
+            self.make_schedule("2021-01-23", self.programmes),
+            self.make_schedule("2021-01-24", self.programmes[-5:]),
+        ]
+
+    def test_xmltv(self):
+        f = io.StringIO()
+        bbcradio.export.write_xmltv([self.station], self.make_schedules(), f)
+        tv = ET.fromstring(f.getvalue().encode("utf-8"))
+
+        (channel,) = tv.findall("channel")
+        self.assertEqual("p00fzl86", channel.get("id"))
+        self.assertEqual("BBC Radio 1", channel.findtext("display-name"))
+
+        programmes = tv.findall("programme")
+        self.assertEqual(22, len(programmes))
+        self.assertEqual("20210123000000 +0000", programmes[0].get("start"))
+        self.assertEqual("20210123020000 +0000", programmes[0].get("stop"))
+        self.assertEqual("p00fzl86", programmes[0].get("channel"))
+        self.assertEqual(
+            "Radio 1's Essential Mix", programmes[0].findtext("title")
+        )
+        self.assertEqual(
+            "Vintage Culture", programmes[0].findtext("sub-title")
+        )
+
+    def test_icalendar(self):
+        f = io.StringIO(newline="")
+        bbcradio.export.write_icalendar(
+            self.make_schedules(),
+            f,
+            datetime.datetime(2021, 1, 22, tzinfo=datetime.timezone.utc),
+        )
+        output = f.getvalue()
+
+        self.assertTrue(output.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertTrue(output.endswith("END:VCALENDAR\r\n"))
+        self.assertEqual(22, output.count("BEGIN:VEVENT\r\n"))
+        self.assertIn("DTSTART:20210123T000000Z\r\n", output)
+        self.assertIn("DTEND:20210123T020000Z\r\n", output)
+        self.assertIn(
+            "SUMMARY:Radio 1's Essential Mix - Vintage Culture\r\n", output
+        )
+        self.assertIn("UID:m000rcdj-20210123T000000Z@p00fzl86\r\n", output)
+
+        lines = output.split("\r\n")
+        for line in lines:
+            self.assertLessEqual(len(line.encode("utf-8")), 75)
+
+    def test_icalendar_text_escaped_and_folded(self):
+        line = bbcradio.export._icalendar_line(
+            "DESCRIPTION:"
+            + bbcradio.export._icalendar_text("Café; news, weather\n" * 5)
+        )
+        parts = line[: -len("\r\n")].split("\r\n")
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertLessEqual(len(part.encode("utf-8")), 75)
+        unfolded = "".join(
+            part[1:] if n else part for n, part in enumerate(parts)
+        )
+        self.assertEqual(
+            "DESCRIPTION:" + "Café\\; news\\, weather\\n" * 5, unfolded
+        )
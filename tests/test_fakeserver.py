@@ -0,0 +1,98 @@
+import gc
+import unittest
+import weakref
+
+import bbcradio
+import bbcradio.fakeserver
+import requests
+
+
+class TestFakeServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = bbcradio.fakeserver.FakeServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_stations_and_schedule(self):
+        stations = bbcradio.Stations(base_url=self.server.base_url)
+        station = stations.select("BBC Radio 2")
+        self.assertEqual(
+            self.server.base_url + "/schedules/p00fzl8v", station.url
+        )
+
+        schedule = bbcradio.Schedule(station, "2021-03-01")
+        programmes = schedule.programmes
+        self.assertEqual(22, len(programmes))
+        self.assertEqual(
+            "2021-03-01T00:00:00+00:00", programmes[0].info["start_date"]
+        )
+        self.assertEqual(
+            "2021-03-02T06:00:00+00:00", programmes[-1].info["end_date"]
+        )
+
+    def test_unknown_pages(self):
+        for path in [
+            "/not-a-page",
+            "/schedules/p00fzl8v/2021/02/30",
+            "/schedules/notastation/2021/03/01",
+        ]:
+            with self.subTest(path=path):
+                r = requests.get(self.server.base_url + path)
+                self.assertEqual(404, r.status_code)
+
+    def test_etag(self):
+        url = self.server.base_url + "/schedules/p00fzl8v/2021/03/01"
+        r = requests.get(url)
+        self.assertEqual(200, r.status_code)
+        self.assertEqual("gzip", r.headers["Content-Encoding"])
+
+        r = requests.get(url, headers={"If-None-Match": r.headers["ETag"]})
+        self.assertEqual(304, r.status_code)
+        self.assertEqual(b"", r.content)
+
+    def test_etag_per_encoding(self):
+        url = self.server.base_url + "/schedules/p00fzl8v/2021/03/01"
+        gzip_etag = requests.get(url).headers["ETag"]
+        identity = {"Accept-Encoding": "identity"}
+        r = requests.get(url, headers=identity)
+        self.assertNotIn("Content-Encoding", r.headers)
+        self.assertNotEqual(gzip_etag, r.headers["ETag"])
+
+        r = requests.get(url, headers={**identity, "If-None-Match": gzip_etag})
+        self.assertEqual(200, r.status_code)
+
+    def test_page_cache_size(self):
+        server = bbcradio.fakeserver.FakeServer(cache_size=2)
+        self.addCleanup(server.stop)
+        for day in range(1, 5):
+            server.page(f"/schedules/p00fzl8v/2021/03/{day:02d}")
+        self.assertEqual(2, len(server._pages))
+
+    def test_stopped_server_collected(self):
+        server = bbcradio.fakeserver.FakeServer()
+        server.start()
+        requests.get(server.base_url + "/schedules/p00fzl8v/2021/03/01")
+        server.stop()
+
+        server_ref = weakref.ref(server)
+        del server
+        gc.collect()
+        self.assertIsNone(server_ref())
+
+    def test_no_gzip(self):
+        self.server.gzip = False
+        self.addCleanup(setattr, self.server, "gzip", True)
+        r = requests.get(self.server.base_url + "/sounds/schedules")
+        self.assertNotIn("Content-Encoding", r.headers)
+
+    def test_errors(self):
+        self.server.error_rate = 1.0
+        self.addCleanup(setattr, self.server, "error_rate", 0.0)
+        stations = bbcradio.Stations(base_url=self.server.base_url)
+        self.assertRaises(
+            requests.exceptions.HTTPError, stations.select, "BBC Radio 2"
+        )
@@ -0,0 +1,105 @@
+import pathlib
+import tempfile
+import unittest
+
+import bbcradio
+import bbcradio.snapshot
+from lxml import html
+
+
+class TestSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        path = pathlib.Path("bbcradio") / "templates" / "schedule.html"
+        with open(path, "r") as f:
+            page_element = html.fromstring(f.read())
+
+        cls.programmes = bbcradio.Schedule._extract(page_element)
+        cls.station = bbcradio.Station(
+            "BBC Radio nan Gàidheal",
+            "https://www.bbc.co.uk/schedules/p00fzl81",
+            "nation",
+            "https://example.com/bbc_radio_nan_gaidheal_colour.svg",
+        )
+        cls.other_station = bbcradio.Station(
+            "BBC Unittest Station", "https://example.com/unittest"
+        )
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = pathlib.Path(tmpdir.name) / "schedules.snapshot"
+
+        self.schedules = [
+            bbcradio.Schedule(self.station, "2021-01-23", self.programmes),
+            bbcradio.Schedule(
+                self.other_station,
+                "2021-06-01",
+                [
+                    bbcradio.Programme(
+                        start_date="2021-06-01T00:00:00+01:00",
+                        name="Programme without end or series",
+                    )
+                ],
+            ),
+            bbcradio.Schedule(self.other_station, "2021-06-02", []),
+        ]
+        bbcradio.snapshot.write_snapshot(self.schedules, self.path)
+
+    def test_round_trip(self):
+        with bbcradio.snapshot.SnapshotReader(self.path) as reader:
+            self.assertEqual(3, len(reader))
+            schedules = list(reader.schedules())
+            self.assertEqual(self.schedules, schedules)
+
+            station = schedules[0].station
+            self.assertEqual(self.station, station)
+            self.assertEqual("nation", station.network_type)
+            self.assertEqual(self.station.logo_url, station.logo_url)
+
+    def test_schedule_lookup(self):
+        with bbcradio.snapshot.SnapshotReader(self.path) as reader:
+            schedule = reader.schedule("BBC Radio nan Gàidheal", "2021-01-23")
+            self.assertEqual(self.programmes, schedule.programmes)
+            self.assertEqual(self.programmes[-1], schedule._programmes[-1])
+            self.assertEqual(self.programmes[2:4], schedule._programmes[2:4])
+            self.assertRaises(
+                KeyError, reader.schedule, "BBC Radio 1", "2021-01-23"
+            )
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot, but long enough to have a header")
+        self.assertRaises(
+            bbcradio.snapshot.SnapshotError,
+            bbcradio.snapshot.SnapshotReader,
+            self.path,
+        )
+
+    def test_unsupported_version(self):
+        with open(self.path, "r+b") as f:
+            f.seek(len(bbcradio.snapshot.MAGIC))
+            f.write(b"\xff\xff")
+        with self.assertRaises(bbcradio.snapshot.SnapshotError) as cm:
+            bbcradio.snapshot.SnapshotReader(self.path)
+        self.assertIn("version", str(cm.exception))
+
+    def test_truncated(self):
+        with open(self.path, "rb") as f:
+            content = f.read()
+        for length in [80, len(content) - 1]:
+            with self.subTest(length=length):
+                with open(self.path, "wb") as f:
+                    f.write(content[:length])
+                with self.assertRaises(bbcradio.snapshot.SnapshotError) as cm:
+                    bbcradio.snapshot.SnapshotReader(self.path)
+                self.assertIn("truncated", str(cm.exception))
+
+    def test_corrupt_string(self):
+        # Make the first string's length run past the string data.
+        with open(self.path, "r+b") as f:
+            f.seek(bbcradio.snapshot._HEADER.size + 8)
+            f.write(b"\xff\xff\xff\x00")
+        with bbcradio.snapshot.SnapshotReader(self.path) as reader:
+            schedule = next(reader.schedules())
+            self.assertRaises(bbcradio.snapshot.SnapshotError, list, schedule)